@@ -0,0 +1,56 @@
+"""Measure per-recipe memory of the in-memory catalog.
+
+Builds a catalog of synthetic recipes shaped like data/recipes.json and
+reports bytes per recipe (from both ``Catalog.memory_usage`` and
+tracemalloc) with an extrapolation to one million recipes.
+
+    python scripts/catalog_memory.py --recipes 200000
+"""
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.catalog import Catalog  # noqa: E402
+
+
+def synthetic_rows(count, rng):
+    base = json.loads((ROOT / 'data' / 'recipes.json').read_text('utf-8'))
+    vocab = sorted({i for r in base for i in r.get('ingredients', [])})
+    steps = [s for r in base for s in r.get('steps', [])]
+    for n in range(1, count + 1):
+        yield (
+            n,
+            f'Recipe {n}',
+            json.dumps(rng.sample(vocab, rng.randint(3, 10))),
+            json.dumps(rng.sample(steps, min(len(steps), 4))),
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Catalog memory per recipe')
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = list(synthetic_rows(args.recipes, random.Random(args.seed)))
+    catalog = Catalog()
+    tracemalloc.start()
+    catalog.load_rows(rows)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    usage = catalog.memory_usage()
+    usage['traced_bytes'] = traced
+    usage['traced_bytes_per_recipe'] = round(traced / args.recipes, 1)
+    usage['projected_mb_for_1m'] = round(traced / args.recipes * 1e6 / 2**20, 1)
+    print(json.dumps(usage, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,25 @@
-import json
-from pathlib import Path
+import sys
 
 from src.db import init_db, SessionLocal
-from src import models
+from src import jobs
 
 
 def main():
     init_db()
-    p = Path(__file__).resolve().parents[1] / 'data' / 'recipes.json'
-    if not p.exists():
-        print('data/recipes.json not found')
+    name = sys.argv[1] if len(sys.argv) > 1 else 'recipes.json'
+    try:
+        jobs.resolve_data_path(name)
+    except (ValueError, FileNotFoundError) as exc:
+        print(f'data/{name}: {exc}')
         return
-    data = json.loads(p.read_text(encoding='utf-8'))
-    db = SessionLocal()
-    added = 0
-    for r in data:
-        name = r.get('name')
-        if not name:
-            continue
-        exists = (
-            db.query(models.Recipe)
-            .filter(models.Recipe.name == name)
-            .first()
-        )
-        if exists:
-            continue
-        recipe = models.Recipe(
-            name=name,
-            ingredients=json.dumps(r.get('ingredients', [])),
-            steps=json.dumps(r.get('steps', [])),
-        )
-        db.add(recipe)
-        added += 1
-    db.commit()
-    db.close()
-    print(f'Imported {added} recipes')
+    # same chunked import the app runs in the background; each chunk is
+    # logged to recipe_changes so running app workers pick the rows up
+    job = jobs.Job('import', {'path': name})
+    jobs.run(job, SessionLocal)
+    if job.state != jobs.DONE:
+        print(f'Import {job.state}: {job.error}')
+        return
+    print(f"Imported {job.result['added']} recipes")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,274 @@
+"""End-to-end load test for the web app.
+
+Starts ``src.app:app`` under uvicorn against a freshly seeded temporary
+SQLite database, drives a weighted mix of requests at a fixed target rate
+from an asyncio client, and prints a JSON report with throughput, latency
+percentiles and error rates per endpoint.
+
+Requests are scheduled open-loop: each one is sent at its planned time
+whether or not earlier requests have finished, and latency is measured
+from that planned time. A slow server therefore shows up as tail latency
+instead of silently lowering the offered load.
+
+Example::
+
+    python scripts/loadtest.py --rate 200 --duration 30 --workers 2 \\
+        --mix root=1,match=2,view=3,search=3,write=1 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_MIX = "root=1,match=2,view=3,search=3,write=1"
+LANGS = ["pl", "es", ""]
+
+
+def parse_mix(text):
+    """Parse ``name=weight,...`` into a dict, rejecting unknown names."""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("mix must contain at least one positive weight")
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, k))]
+
+
+def seed_database(path, count, rng):
+    """Create the schema in ``path`` and insert ``count`` recipes.
+
+    Returns the ingredient vocabulary, so the client can build realistic
+    match queries, and the recipe ids (not contiguous when sharded).
+    """
+    os.environ["RECIPIES_DATABASE_URL"] = f"sqlite:///{path}"
+    from src import crud, schemas
+    from src.db import SessionLocal, init_db
+
+    init_db()
+    base = json.loads((ROOT / "data" / "recipes.json").read_text("utf-8"))
+    vocab = sorted({i for r in base for i in r.get("ingredients", [])})
+    steps = [s for r in base for s in r.get("steps", [])]
+    db = SessionLocal()
+    try:
+        # through crud so RECIPIES_SHARDS is honoured
+        crud.create_recipes_bulk(db, [
+            schemas.RecipeCreate(
+                name=f"Seed recipe {n}",
+                ingredients=rng.sample(vocab, rng.randint(2, 8)),
+                steps=rng.sample(steps, min(len(steps), 4)),
+            )
+            for n in range(count)
+        ])
+        ids = [r.id for r in crud.get_recipes(db, skip=0, limit=count)]
+    finally:
+        db.close()
+    return vocab, ids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, port, workers):
+    env = dict(os.environ, RECIPIES_DATABASE_URL=f"sqlite:///{db_path}")
+    cmd = [
+        sys.executable, "-m", "uvicorn", "src.app:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    # cwd matters: templates are resolved relative to the project root
+    return subprocess.Popen(cmd, cwd=str(ROOT), env=env)
+
+
+async def wait_ready(client, proc, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            res = await client.get("/api/recipes", params={"page_size": 1})
+            if res.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready in time")
+
+
+# Each scenario issues one request and returns the response.
+
+async def _root(client, ctx):
+    return await client.get("/")
+
+
+async def _match(client, ctx):
+    have = ctx["rng"].sample(ctx["vocab"], min(len(ctx["vocab"]), 4))
+    return await client.post("/match", data={"ingredients": "\n".join(have)})
+
+
+async def _view(client, ctx):
+    rid = ctx["rng"].choice(ctx["ids"])
+    lang = ctx["rng"].choice(LANGS)
+    params = {"lang": lang} if lang else None
+    return await client.get(f"/recipes/{rid}", params=params)
+
+
+async def _search(client, ctx):
+    q = str(ctx["rng"].randint(0, ctx["recipes"]))
+    return await client.get("/api/recipes", params={"q": q, "page": 1, "page_size": 10})
+
+
+async def _write(client, ctx):
+    ctx["writes"] += 1
+    payload = {
+        "name": f"Load {ctx['run']} {ctx['writes']}",
+        "ingredients": ctx["rng"].sample(ctx["vocab"], 3),
+        "steps": ["mix", "cook"],
+    }
+    return await client.post("/api/recipes", json=payload)
+
+
+SCENARIOS = {
+    "root": _root,
+    "match": _match,
+    "view": _view,
+    "search": _search,
+    "write": _write,
+}
+
+
+async def drive(base_url, mix, rate, duration, ctx, proc, concurrency):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = {n: [] for n in names}
+    errors = {n: 0 for n in names}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await wait_ready(client, proc)
+
+        async def one(name, planned):
+            try:
+                res = await SCENARIOS[name](client, ctx)
+                ok = res.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples[name].append(time.perf_counter() - planned)
+            if not ok:
+                errors[name] += 1
+
+        tasks = []
+        total = int(rate * duration)
+        start = time.perf_counter()
+        for i in range(total):
+            planned = start + i / rate
+            delay = planned - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = ctx["rng"].choices(names, weights)[0]
+            tasks.append(asyncio.create_task(one(name, planned)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return samples, errors, elapsed
+
+
+def summarize(latencies, errors):
+    ordered = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 3)  # noqa: E731
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+    }
+
+
+def build_report(args, mix, samples, errors, elapsed):
+    all_latencies = [v for vals in samples.values() for v in vals]
+    overall = summarize(all_latencies, sum(errors.values()))
+    overall["throughput_rps"] = round(len(all_latencies) / elapsed, 2) if elapsed else 0.0
+    return {
+        "config": {
+            "rate": args.rate,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "recipes": args.recipes,
+            "mix": mix,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "overall": overall,
+        "endpoints": {n: summarize(samples[n], errors[n]) for n in samples},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=50.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--recipes", type=int, default=1000, help="recipes to seed")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted scenarios, e.g. %s" % DEFAULT_MIX)
+    parser.add_argument("--concurrency", type=int, default=100, help="max open client connections")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "loadtest.db"
+        vocab, ids = seed_database(db_path, args.recipes, rng)
+        port = free_port()
+        proc = start_server(db_path, port, args.workers)
+        try:
+            ctx = {
+                "rng": rng, "vocab": vocab, "ids": ids, "recipes": args.recipes,
+                "writes": 0, "run": int(time.time()),
+            }
+            samples, errors, elapsed = asyncio.run(drive(
+                f"http://127.0.0.1:{port}", mix, args.rate, args.duration, ctx, proc, args.concurrency,
+            ))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    report = build_report(args, mix, samples, errors, elapsed)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
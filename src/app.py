@@ -1,6 +1,7 @@
 # flake8: noqa
 
 from fastapi import FastAPI, Depends, HTTPException, Request, Form
+from fastapi import Response
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
@@ -11,7 +12,7 @@ from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
 import json
 
-from . import crud, schemas
+from . import catalog, crud, jobs, profiling, schemas, similar
 from .db import SessionLocal, init_db
 from typing import List
 from .normalize import normalize_ingredient, is_ingredient_match
@@ -22,7 +23,14 @@ from .translate import translate_list, translate_text
 async def lifespan(app: FastAPI):
     # Initialize DB once at startup
     init_db()
+    # build the catalog and similarity index in the background; reads fall
+    # back to SQL until they are swapped in
+    jobs.runner.submit("reindex")
+    sampler = profiling.start_sampler()
     yield
+    jobs.runner.shutdown()
+    if sampler is not None:
+        sampler.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -54,6 +62,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling (see src/profiling.py); a no-op unless configured
+app.add_middleware(profiling.ProfilingMiddleware)
+
+
+# How many recipes the match views score per request
+MATCH_LIMIT = 50
+
 
 def get_db():
     db = SessionLocal()
@@ -63,6 +78,52 @@ def get_db():
         db.close()
 
 
+def get_job_runner():
+    return jobs.runner
+
+
+def _recipe_dict(r):
+    return {
+        "id": r.id,
+        "name": r.name,
+        "ingredients": json.loads(r.ingredients or '[]'),
+        "steps": json.loads(r.steps or '[]'),
+    }
+
+
+def _split_lines(text: str) -> List[str]:
+    # one entry per line; blank lines are ignored
+    return [line.strip() for line in (text or '').split('\n') if line.strip()]
+
+
+def _catalog(db: Session):
+    """The in-memory catalog, caught up with the DB, or None if not loaded."""
+    store = catalog.store
+    if not store.loaded:
+        return None
+    # picks up writes made by other worker processes
+    store.sync(db)
+    return store
+
+
+def _match_results(db: Session, have_set: set):
+    store = _catalog(db)
+    if store is not None:
+        # ingredient ids were normalized once when the catalog was built
+        return store.match(store.page(skip=0, limit=MATCH_LIMIT), have_set)
+    return crud.match_recipes(db, have_set, limit=MATCH_LIMIT)
+
+
+@app.get("/api/profiles/{profile_id}")
+def api_profile_report(request: Request, profile_id: str):
+    if not profiling.is_authorized(request.scope.get("headers", [])):
+        raise HTTPException(status_code=404, detail="Not found")
+    report = profiling.load_report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+
 @app.get('/my-recipes')
 def my_recipes():
     raise HTTPException(status_code=501, detail='Not implemented in wireframe')
@@ -81,7 +142,11 @@ def profile():
 @app.get("/", response_class=HTMLResponse)
 def read_root(request: Request, db: Session = Depends(get_db)):
     # Serve match UI at root and show some recipes from the DB as demo tiles
-    recipes = crud.get_recipes(db, skip=0, limit=12)
+    store = _catalog(db)
+    if store is not None:
+        recipes = store.page(skip=0, limit=12)
+    else:
+        recipes = crud.get_recipes(db, skip=0, limit=12)
     results = []
     for r in recipes:
         results.append({
@@ -101,6 +166,7 @@ def read_root(request: Request, db: Session = Depends(get_db)):
 
 
 @app.post('/match', response_class=HTMLResponse)
+@profiling.profiled
 def match_post(request: Request, ingredients: str = Form(''), db: Session = Depends(get_db)):
     # Receive newline-separated ingredients from the hidden textarea
     have_text = ingredients or ''
@@ -108,25 +174,7 @@ def match_post(request: Request, ingredients: str = Form(''), db: Session = Depe
     have_set = set([h for h in have_list if h])
 
     # Simple exact-match demo: mark recipes that have ingredients fully satisfied by `have_set`.
-    recipes = crud.get_recipes(db, skip=0, limit=50)
-    results = []
-    for r in recipes:
-        try:
-            ings = json.loads(r.ingredients or '[]')
-        except Exception:
-            ings = []
-        norm_ings = [normalize_ingredient(i) for i in ings if i]
-        matched = [i for i in norm_ings if i in have_set]
-        missing = [i for i in norm_ings if i not in have_set]
-        results.append({
-            "id": r.id,
-            "name": r.name,
-            "matched_count": len(matched),
-            "matched": matched,
-            "match": len(missing) == 0,
-            "missing_count": len(missing),
-            "missing": missing,
-        })
+    results = _match_results(db, have_set)
 
     return templates.TemplateResponse(request, 'match.html', {"have_text": have_text, "results": {"have": have_list, "results": results}})
 
@@ -155,6 +203,13 @@ def view_recipe(
     back_label = translate_text("Back", lang) if lang else "Back"
     edit_label = translate_text("Edit", lang) if lang else "Edit"
     delete_label = translate_text("Delete", lang) if lang else "Delete"
+    recipe["labels"] = {
+        "ingredients": heading_ingredients,
+        "steps": heading_steps,
+        "back": back_label,
+        "edit": edit_label,
+        "delete": delete_label,
+    }
     # For wireframe/demo mode return JSON so clicking a tile shows recipe data.
     return JSONResponse(content=recipe)
 
@@ -165,31 +220,201 @@ def edit_recipe_form(
 ):
     r = crud.get_recipe(db, recipe_id)
     if not r:
-        from fastapi import FastAPI, Request
-        from fastapi.responses import HTMLResponse
-        from fastapi.templating import Jinja2Templates
-        from fastapi.staticfiles import StaticFiles
-        from pathlib import Path
-        from contextlib import asynccontextmanager
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    recipe = _recipe_dict(r)
+    # textareas hold one entry per line
+    recipe["ingredients"] = "\n".join(recipe["ingredients"])
+    recipe["steps"] = "\n".join(recipe["steps"])
+    return templates.TemplateResponse(request, "edit.html", {"recipe": recipe})
+
+
+@app.post("/recipes/{recipe_id}/edit")
+def edit_recipe(
+    recipe_id: int,
+    name: str = Form(...),
+    ingredients: str = Form(''),
+    steps: str = Form(''),
+    db: Session = Depends(get_db),
+):
+    existing = crud.get_recipe_by_name(db, name)
+    if existing and existing.id != recipe_id:
+        raise HTTPException(status_code=400, detail="Recipe with this name already exists")
+    recipe_in = schemas.RecipeCreate(name=name, ingredients=_split_lines(ingredients), steps=_split_lines(steps))
+    r = crud.update_recipe(db, recipe_id, recipe_in)
+    if not r:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return RedirectResponse(url=f"/recipes/{r.id}", status_code=303)
+
+
+@app.post("/recipes/{recipe_id}/delete")
+def delete_recipe(recipe_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_recipe(db, recipe_id):
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return RedirectResponse(url="/", status_code=303)
+
+
+@app.post("/recipes")
+def create_recipe(
+    name: str = Form(...),
+    ingredients: str = Form(''),
+    steps: str = Form(''),
+    db: Session = Depends(get_db),
+):
+    if crud.get_recipe_by_name(db, name):
+        raise HTTPException(status_code=400, detail="Recipe with this name already exists")
+    recipe_in = schemas.RecipeCreate(name=name, ingredients=_split_lines(ingredients), steps=_split_lines(steps))
+    r = crud.create_recipe(db, recipe_in)
+    return RedirectResponse(url=f"/recipes/{r.id}", status_code=303)
+
+
+# JSON API
+
+@app.get("/api/recipes")
+def api_list_recipes(
+    request: Request,
+    response: Response,
+    q: str | None = None,
+    page: int = 1,
+    page_size: int = 10,
+    db: Session = Depends(get_db),
+):
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    skip = (page - 1) * page_size
+    store = _catalog(db)
+    if store is not None:
+        total, records = store.search(q, skip=skip, limit=page_size)
+        items = [store.to_dict(r) for r in records]
+    else:
+        total = crud.count_recipes_filtered(db, q)
+        items = [_recipe_dict(r) for r in crud.search_recipes(db, q, skip=skip, limit=page_size)]
+    # RFC 8288 Link header so clients can follow pagination
+    links = []
+    if page > 1:
+        links.append(f'<{request.url.include_query_params(page=page - 1)}>; rel="prev"')
+    if page * page_size < total:
+        links.append(f'<{request.url.include_query_params(page=page + 1)}>; rel="next"')
+    response.headers["Link"] = ", ".join(links)
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+    }
+
+
+@app.post("/api/recipes", response_model=schemas.Recipe)
+def api_create_recipe(recipe: schemas.RecipeCreate, db: Session = Depends(get_db)):
+    if crud.get_recipe_by_name(db, recipe.name):
+        raise HTTPException(status_code=400, detail="Recipe with this name already exists")
+    return _recipe_dict(crud.create_recipe(db, recipe))
+
+
+@app.get("/api/recipes/{recipe_id}", response_model=schemas.Recipe)
+def api_get_recipe(recipe_id: int, db: Session = Depends(get_db)):
+    r = crud.get_recipe(db, recipe_id)
+    if not r:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return _recipe_dict(r)
+
+
+@app.put("/api/recipes/{recipe_id}", response_model=schemas.Recipe)
+def api_update_recipe(recipe_id: int, recipe: schemas.RecipeCreate, db: Session = Depends(get_db)):
+    existing = crud.get_recipe_by_name(db, recipe.name)
+    if existing and existing.id != recipe_id:
+        raise HTTPException(status_code=400, detail="Recipe with this name already exists")
+    r = crud.update_recipe(db, recipe_id, recipe)
+    if not r:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return _recipe_dict(r)
+
+
+@app.delete("/api/recipes/{recipe_id}")
+def api_delete_recipe(recipe_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_recipe(db, recipe_id):
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return {"deleted": True}
+
+
+@app.get("/api/recipes/{recipe_id}/similar")
+def api_similar_recipes(recipe_id: int, db: Session = Depends(get_db)):
+    # neighbours are precomputed by the similarity index; reads never
+    # build it, they only apply logged writes and look names up
+    index = similar.index
+    if index is None:
+        raise HTTPException(status_code=503, detail="Similarity index is still building")
+    similar.sync(db)
+    if recipe_id not in index:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    neighbours = index.neighbours(recipe_id)
+    names = crud.get_recipe_names(db, [other_id for other_id, _ in neighbours])
+    items = [
+        {"id": other_id, "name": names[other_id], "score": round(score, 3)}
+        for other_id, score in neighbours
+        if other_id in names
+    ]
+    return {"id": recipe_id, "items": items}
+
+
+@app.post("/api/match")
+@profiling.profiled
+def api_match(payload: schemas.MatchRequest, db: Session = Depends(get_db)):
+    have_list = [normalize_ingredient(x) for x in payload.ingredients if x and x.strip()]
+    have_set = set([h for h in have_list if h])
+    return {"have": have_list, "results": _match_results(db, have_set)}
 
 
-        @asynccontextmanager
-        async def lifespan(app: FastAPI):
-            # Minimal app for wireframe prototype; no DB initialization
-            yield
+# Background jobs
 
+def _job_or_404(runner: jobs.JobRunner, job_id: str):
+    job = runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-        app = FastAPI(lifespan=lifespan)
-        templates = Jinja2Templates(directory="templates")
 
-        # Serve static assets from the project static directory
-        static_dir = Path(__file__).resolve().parents[1] / "static"
-        app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+@app.post("/api/jobs/import", status_code=202)
+def api_start_import(payload: schemas.ImportJobRequest, runner: jobs.JobRunner = Depends(get_job_runner)):
+    try:
+        jobs.resolve_data_path(payload.path)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Import file not found")
+    job = runner.submit("import", path=payload.path, chunk_size=payload.chunk_size)
+    return job.to_dict()
+
+
+@app.post("/api/jobs/reindex", status_code=202)
+def api_start_reindex(
+    payload: schemas.ReindexJobRequest | None = None,
+    runner: jobs.JobRunner = Depends(get_job_runner),
+):
+    payload = payload or schemas.ReindexJobRequest()
+    return runner.submit("reindex", chunk_size=payload.chunk_size).to_dict()
+
 
+@app.get("/api/jobs")
+def api_list_jobs(runner: jobs.JobRunner = Depends(get_job_runner)):
+    return {"items": [job.to_dict() for job in runner.jobs()]}
 
-        @app.get("/", response_class=HTMLResponse)
-        def read_root(request: Request, q: str | None = None):
-            # Render the wireframe-first match page. Keep have_text optional for demo.
-            have_text = q or ""
-            return templates.TemplateResponse(request, "match.html", {"have_text": have_text})
 
+@app.get("/api/jobs/{job_id}")
+def api_get_job(job_id: str, runner: jobs.JobRunner = Depends(get_job_runner)):
+    return _job_or_404(runner, job_id).to_dict()
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def api_cancel_job(job_id: str, runner: jobs.JobRunner = Depends(get_job_runner)):
+    _job_or_404(runner, job_id)
+    return runner.cancel(job_id).to_dict()
+
+
+@app.post("/api/jobs/{job_id}/resume", status_code=202)
+def api_resume_job(job_id: str, runner: jobs.JobRunner = Depends(get_job_runner)):
+    _job_or_404(runner, job_id)
+    try:
+        job = runner.resume(job_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return job.to_dict()
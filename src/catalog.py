@@ -0,0 +1,259 @@
+"""Compact read-only catalog for the hot read paths.
+
+Hydrating ORM ``Recipe`` objects for every tile grid, match or list request
+costs identity-map bookkeeping plus a ``json.loads`` and normalization pass
+per recipe. The catalog keeps one small ``__slots__`` record per recipe
+instead: ingredients are interned into integer ids over a shared vocabulary
+and stored in ``array('I')``, normalized ingredient ids are precomputed for
+matching, and steps stay as their UTF-8 JSON bytes until a page needs them.
+
+Records live in a list sorted by id, which gives the same order as the
+unordered SQLite queries it replaces and cheap offset/limit pagination.
+Writers replace the list (copy-on-write), so readers work on a snapshot
+without taking the lock.
+
+The catalog is built in the background at startup (see ``jobs``) and swapped
+in whole with :func:`install`; until then reads fall back to SQL. Before
+serving, :meth:`Catalog.sync` applies any rows written since (by this or any
+other worker process) from the ``recipe_changes`` log.
+"""
+import json
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from operator import attrgetter
+from typing import Dict, List, Optional, Set
+
+from . import changes
+from .normalize import normalize_ingredient
+
+_record_id = attrgetter("id")
+
+
+class Vocabulary:
+    """Interns strings into dense integer ids shared by all records."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.words: List[str] = []
+
+    def intern(self, word: str) -> int:
+        i = self.ids.get(word)
+        if i is None:
+            i = self.ids[word] = len(self.words)
+            self.words.append(word)
+        return i
+
+    def lookup(self, word: str) -> Optional[int]:
+        return self.ids.get(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+class CatalogRecord:
+    __slots__ = ("id", "name", "key", "ingredients", "normalized", "steps")
+
+    def __init__(self, id, name, ingredients, normalized, steps):
+        self.id = id
+        self.name = name
+        # lowercased name for search; shares the object when already lower
+        key = name.lower()
+        self.key = name if key == name else key
+        self.ingredients = ingredients
+        self.normalized = normalized
+        self.steps = steps
+
+
+def _loads(raw) -> list:
+    try:
+        return json.loads(raw or "[]")
+    except Exception:
+        return []
+
+
+class Catalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.vocab = Vocabulary()
+        self._records: List[CatalogRecord] = []
+        self.loaded = False
+        # mark of the last recipe_changes row applied
+        self.last_change = 0
+
+    # building
+
+    def _make_record(self, recipe_id, name, ingredients_json, steps_json):
+        raw = [i for i in _loads(ingredients_json) if isinstance(i, str)]
+        ingredients = array("I", [self.vocab.intern(i) for i in raw])
+        norm = [normalize_ingredient(i) for i in raw if i]
+        normalized = array("I", [self.vocab.intern(n) for n in norm if n])
+        if normalized == ingredients:
+            # usual case: ingredients already normalized, share the array
+            normalized = ingredients
+        steps = (steps_json or "[]").encode("utf-8")
+        return CatalogRecord(recipe_id, name, ingredients, normalized, steps)
+
+    def load(self, db):
+        """Replace the catalog with every recipe in ``db``."""
+        # read the mark first: anything written during the scan is replayed
+        mark = changes.last_change_id(db)
+        self.load_rows(changes.iter_rows(db), last_change=mark)
+        self.sync(db)
+
+    def load_rows(self, rows, last_change: int = 0):
+        """Replace the catalog from (id, name, ingredients, steps) rows.
+
+        Rows must be sorted by id; ingredients and steps are JSON text as
+        stored in the ``recipes`` table. This resets the vocabulary, so use
+        it on a catalog that is not serving yet (build a new one and swap
+        it in to reload a live process).
+        """
+        with self._lock:
+            self.vocab = Vocabulary()
+            self._records = [self._make_record(*row) for row in rows]
+            self.last_change = last_change
+            self.loaded = True
+
+    def append_rows(self, rows):
+        """Add (id, name, ingredients, steps) rows to a catalog being built.
+
+        Rows must come after every record already present, in id order;
+        like :meth:`load_rows`, not for a catalog that is serving.
+        """
+        with self._lock:
+            self._records.extend(self._make_record(*row) for row in rows)
+
+    def unload(self):
+        with self._lock:
+            self.vocab = Vocabulary()
+            self._records = []
+            self.last_change = 0
+            self.loaded = False
+
+    def apply_rows(self, recipe_ids, rows):
+        """Make ``recipe_ids`` match ``rows``; ids without a row are removed."""
+        with self._lock:
+            fresh = {row[0]: self._make_record(*row) for row in rows}
+            gone = set(recipe_ids) - set(fresh)
+            records = [
+                fresh.pop(r.id, r) for r in self._records if r.id not in gone
+            ]
+            if fresh:
+                records.extend(fresh.values())
+                records.sort(key=_record_id)
+            self._records = records
+
+    def sync(self, db) -> bool:
+        """Apply recipe writes logged since the last sync.
+
+        Costs a single ``max(id)`` query (per shard) when nothing changed. Rows are
+        re-read under the lock, so concurrent writers can never leave an
+        older version in place. Returns True if anything was applied.
+        """
+        if not self.loaded or changes.caught_up(db, self.last_change):
+            return False
+        with self._lock:
+            latest, ids = changes.changed_since(db, self.last_change)
+            if not ids:
+                return False
+            self.apply_rows(ids, changes.fetch_rows(db, ids))
+            self.last_change = latest
+        return True
+
+    # reading
+
+    def get(self, recipe_id: int) -> Optional[CatalogRecord]:
+        records = self._records
+        i = bisect_left(records, recipe_id, key=_record_id)
+        if i < len(records) and records[i].id == recipe_id:
+            return records[i]
+        return None
+
+    def page(self, skip: int = 0, limit: int = 100) -> List[CatalogRecord]:
+        return self._records[skip:skip + limit]
+
+    def count(self) -> int:
+        return len(self._records)
+
+    def search(self, q: Optional[str] = None, skip: int = 0, limit: int = 100):
+        """Case-insensitive substring search on name, like ``crud``.
+
+        Returns (total matches, requested page) from a single pass.
+        """
+        records = self._records
+        if not q:
+            return len(records), records[skip:skip + limit]
+        needle = q.lower()
+        found = [r for r in records if needle in r.key]
+        return len(found), found[skip:skip + limit]
+
+    def to_dict(self, rec: CatalogRecord) -> dict:
+        words = self.vocab.words
+        return {
+            "id": rec.id,
+            "name": rec.name,
+            "ingredients": [words[i] for i in rec.ingredients],
+            "steps": _loads(rec.steps),
+        }
+
+    def match(self, records: List[CatalogRecord], have_set: Set[str]) -> List[dict]:
+        """Score ``records`` against normalized ingredients the user has."""
+        words = self.vocab.words
+        have_ids = set(i for i in (self.vocab.lookup(h) for h in have_set) if i is not None)
+        results = []
+        for rec in records:
+            matched = [words[i] for i in rec.normalized if i in have_ids]
+            missing = [words[i] for i in rec.normalized if i not in have_ids]
+            results.append({
+                "id": rec.id,
+                "name": rec.name,
+                "matched_count": len(matched),
+                "matched": matched,
+                "match": len(missing) == 0,
+                "missing_count": len(missing),
+                "missing": missing,
+            })
+        return results
+
+    # measuring
+
+    def memory_usage(self) -> dict:
+        """Approximate bytes held by records and the shared vocabulary."""
+        with self._lock:
+            records = sys.getsizeof(self._records)
+            for rec in self._records:
+                records += sys.getsizeof(rec) + sys.getsizeof(rec.name)
+                records += sys.getsizeof(rec.ingredients) + sys.getsizeof(rec.steps)
+                if rec.key is not rec.name:
+                    records += sys.getsizeof(rec.key)
+                if rec.normalized is not rec.ingredients:
+                    records += sys.getsizeof(rec.normalized)
+            vocab = sys.getsizeof(self.vocab.ids) + sys.getsizeof(self.vocab.words)
+            vocab += sum(sys.getsizeof(w) + sys.getsizeof(i) for w, i in self.vocab.ids.items())
+            n = len(self._records)
+        return {
+            "recipes": n,
+            "vocabulary": len(self.vocab),
+            "record_bytes": records,
+            "vocabulary_bytes": vocab,
+            "bytes_per_recipe": round(records / n, 1) if n else 0.0,
+        }
+
+
+# Process-wide catalog, swapped in whole by `install`; `sync` keeps it
+# current with the database
+store = Catalog()
+
+
+def install(fresh: Catalog, db=None):
+    """Make ``fresh`` the process-wide catalog and catch it up with ``db``.
+
+    Readers holding the previous catalog finish on it undisturbed.
+    """
+    global store
+    fresh.loaded = True
+    store = fresh
+    if db is not None:
+        fresh.sync(db)
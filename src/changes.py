@@ -0,0 +1,113 @@
+"""Helpers around the ``recipe_changes`` log.
+
+With sharded storage every shard keeps its own log, written in the same
+transaction as the recipe, and a position in the log ("mark") is a tuple
+with one change id per shard. A plain database's mark is a single int.
+Callers treat marks as opaque: 0 means "from the beginning" either way.
+"""
+import heapq
+from collections import defaultdict
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .db import ShardedSession, fan_out, session_for_id
+
+# SQLite's default bound-variable limit is 999; stay well below it
+IN_CHUNK = 500
+
+
+def log(db: Session, recipe_id: int):
+    """Record a write to ``recipe_id`` in the current transaction.
+
+    ``db`` is the session the recipe itself was written through.
+    """
+    db.add(models.RecipeChange(recipe_id=recipe_id))
+
+
+def _marks(db, mark) -> tuple:
+    if isinstance(mark, tuple):
+        return mark
+    return (mark,) * (len(db) if isinstance(db, ShardedSession) else 1)
+
+
+def _mark(db, marks):
+    return tuple(marks) if isinstance(db, ShardedSession) else marks[0]
+
+
+def last_change_id(db):
+    marks = fan_out(db, lambda s: s.query(func.max(models.RecipeChange.id)).scalar() or 0)
+    return _mark(db, marks)
+
+
+def caught_up(db, mark) -> bool:
+    """True if nothing was logged after ``mark``; one max() per shard."""
+    latest = _marks(db, last_change_id(db))
+    return all(a <= b for a, b in zip(latest, _marks(db, mark)))
+
+
+def changed_since(db: Session, change_id):
+    """Return (latest mark, ids of recipes written after ``change_id``)."""
+    def read(session, since):
+        rows = (
+            session.query(models.RecipeChange.id, models.RecipeChange.recipe_id)
+            .filter(models.RecipeChange.id > since)
+            .order_by(models.RecipeChange.id)
+            .all()
+        )
+        return (rows[-1][0] if rows else since), set(r for _, r in rows)
+
+    results = fan_out(db, read, _marks(db, change_id))
+    ids = set().union(*(found for _, found in results))
+    return _mark(db, [latest for latest, _ in results]), ids
+
+
+def fetch_rows(db: Session, recipe_ids):
+    """Current (id, name, ingredients, steps) rows for ``recipe_ids``.
+
+    Ids that no longer exist are simply absent from the result.
+    """
+    by_session = defaultdict(list)
+    for recipe_id in sorted(recipe_ids):
+        by_session[session_for_id(db, recipe_id)].append(recipe_id)
+    rows = []
+    for session, ids in by_session.items():
+        for i in range(0, len(ids), IN_CHUNK):
+            rows.extend(
+                session.query(
+                    models.Recipe.id, models.Recipe.name,
+                    models.Recipe.ingredients, models.Recipe.steps,
+                )
+                .filter(models.Recipe.id.in_(ids[i:i + IN_CHUNK]))
+                .all()
+            )
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def rows_after(db, last_id: int, limit: int):
+    """The next ``limit`` (id, name, ingredients, steps) rows by id."""
+    def read(session):
+        return (
+            session.query(
+                models.Recipe.id, models.Recipe.name,
+                models.Recipe.ingredients, models.Recipe.steps,
+            )
+            .filter(models.Recipe.id > last_id)
+            .order_by(models.Recipe.id)
+            .limit(limit)
+            .all()
+        )
+    return list(heapq.merge(*fan_out(db, read)))[:limit]
+
+
+def iter_rows(db, chunk_size: int = 1000):
+    """Every (id, name, ingredients, steps) row in id order, in chunks."""
+    last_id = 0
+    while True:
+        rows = rows_after(db, last_id, chunk_size)
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
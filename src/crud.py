@@ -1,72 +1,250 @@
+import heapq
 import json
+from collections import defaultdict
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import catalog, changes, models, schemas, similar
+from .db import ShardedSession, fan_out, session_for_id
+from .normalize import normalize_ingredient
+
+
+def _sync(db: Session):
+    # bring this process's in-memory read structures up to the log
+    catalog.store.sync(db)
+    similar.sync(db)
+
+
+def _by_shard(db, recipe_ids):
+    """Group ``recipe_ids`` by the session each one lives in."""
+    groups = defaultdict(list)
+    for recipe_id in recipe_ids:
+        groups[session_for_id(db, recipe_id)].append(recipe_id)
+    return groups
+
+
+def _page(db, make_query, skip: int, limit: int):
+    """Rows ``skip:skip + limit`` of ``make_query(session)``, in id order.
+
+    Sharded, every shard returns its first ``skip + limit`` rows and the
+    merge by id keeps global pagination the same as on one file.
+    """
+    if not isinstance(db, ShardedSession):
+        return make_query(db).offset(skip).limit(limit).all()
+
+    def first_rows(session):
+        query = make_query(session).order_by(models.Recipe.id)
+        return query.limit(skip + limit).all()
+
+    merged = heapq.merge(*fan_out(db, first_rows), key=attrgetter("id"))
+    return list(islice(merged, skip, skip + limit))
 
 
 def get_recipe(db: Session, recipe_id: int):
     return (
-        db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
+        session_for_id(db, recipe_id)
+        .query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
     )
 
 
 def get_recipe_by_name(db: Session, name: str):
-    return db.query(models.Recipe).filter(models.Recipe.name == name).first()
+    # a rename keeps a recipe on its shard, so any shard may hold the name
+    found = fan_out(db, lambda s: (
+        s.query(models.Recipe).filter(models.Recipe.name == name).first()
+    ))
+    return next((r for r in found if r is not None), None)
+
+
+def get_recipe_names(db: Session, recipe_ids):
+    """Map each existing id in ``recipe_ids`` to its name.
+
+    One query per shard involved.
+    """
+    names = {}
+    for session, ids in _by_shard(db, recipe_ids).items():
+        for start in range(0, len(ids), changes.IN_CHUNK):
+            rows = session.query(models.Recipe.id, models.Recipe.name).filter(
+                models.Recipe.id.in_(ids[start:start + changes.IN_CHUNK])
+            )
+            names.update(rows.all())
+    return names
 
 
 def get_recipes(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Recipe).offset(skip).limit(limit).all()
+    return _page(db, lambda s: s.query(models.Recipe), skip, limit)
 
 
 def count_recipes(db: Session):
-    return db.query(models.Recipe).count()
+    return sum(fan_out(db, lambda s: s.query(models.Recipe).count()))
 
 
-def search_recipes(
-    db: Session, q: str | None = None, skip: int = 0, limit: int = 100
-):
-    query = db.query(models.Recipe)
+def _search_query(session, q):
+    query = session.query(models.Recipe)
     if q:
         # case-insensitive match on name
         query = query.filter(models.Recipe.name.ilike(f"%{q}%"))
-    return query.offset(skip).limit(limit).all()
+    return query
 
 
-def count_recipes_filtered(db: Session, q: str | None = None):
-    query = db.query(models.Recipe)
-    if q:
-        query = query.filter(models.Recipe.name.ilike(f"%{q}%"))
-    return query.count()
+def search_recipes(
+    db: Session, q: str | None = None, skip: int = 0, limit: int = 100
+):
+    return _page(db, lambda s: _search_query(s, q), skip, limit)
 
 
-def create_recipe(db: Session, recipe: schemas.RecipeCreate):
-    db_recipe = models.Recipe(
+def count_recipes_filtered(db: Session, q: str | None = None):
+    return sum(fan_out(db, lambda s: _search_query(s, q).count()))
+
+
+def _match(recipe, have_set):
+    try:
+        ings = json.loads(recipe.ingredients or '[]')
+    except Exception:
+        ings = []
+    norm_ings = [normalize_ingredient(i) for i in ings if i]
+    matched = [i for i in norm_ings if i in have_set]
+    missing = [i for i in norm_ings if i not in have_set]
+    return {
+        "id": recipe.id,
+        "name": recipe.name,
+        "matched_count": len(matched),
+        "matched": matched,
+        "match": len(missing) == 0,
+        "missing_count": len(missing),
+        "missing": missing,
+    }
+
+
+def match_recipes(db: Session, have_set, limit: int = 50):
+    """Score the first ``limit`` recipes against normalized ``have_set``.
+
+    Sharded, each shard reads and scores its own candidates in parallel.
+    """
+    if not isinstance(db, ShardedSession):
+        recipes = get_recipes(db, skip=0, limit=limit)
+        return [_match(r, have_set) for r in recipes]
+
+    def score(session):
+        query = session.query(models.Recipe).order_by(models.Recipe.id)
+        return [_match(r, have_set) for r in query.limit(limit)]
+
+    merged = heapq.merge(*fan_out(db, score), key=itemgetter("id"))
+    return list(islice(merged, limit))
+
+
+def _target(db, name: str):
+    """Session a new recipe called ``name`` goes to, and the id to give it.
+
+    The id is None on a single file (plain autoincrement). Sharded, the
+    shard comes from the name and the id is allocated inside the INSERT
+    itself, so concurrent writers in any process cannot pick the same one.
+    """
+    if not isinstance(db, ShardedSession):
+        return db, None
+    shard = db.shard_for_name(name)
+    last_id = func.coalesce(func.max(models.Recipe.id), shard)
+    return db.shard(shard), select(last_id + len(db)).scalar_subquery()
+
+
+def _new_row(db, recipe: schemas.RecipeCreate):
+    session, next_id = _target(db, recipe.name)
+    row = models.Recipe(
         name=recipe.name,
         ingredients=json.dumps(recipe.ingredients or []),
         steps=json.dumps(recipe.steps or []),
     )
-    db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    if next_id is not None:
+        row.id = next_id
+    return session, row
+
+
+def create_recipe(db: Session, recipe: schemas.RecipeCreate):
+    session, db_recipe = _new_row(db, recipe)
+    session.add(db_recipe)
+    session.flush()
+    changes.log(session, db_recipe.id)
+    session.commit()
+    session.refresh(db_recipe)
+    _sync(db)
     return db_recipe
 
 
+def _names_taken(session, names):
+    taken = set()
+    # keep each IN list under SQLite's bound-variable limit
+    for start in range(0, len(names), changes.IN_CHUNK):
+        rows = session.query(models.Recipe.name).filter(
+            models.Recipe.name.in_(names[start:start + changes.IN_CHUNK])
+        )
+        taken.update(name for (name,) in rows)
+    return taken
+
+
+def _insert_logged(session, rows):
+    if not rows:
+        return 0
+    session.add_all(rows)
+    session.flush()
+    for row in rows:
+        changes.log(session, row.id)
+    session.commit()
+    return len(rows)
+
+
+def create_recipes_bulk(db: Session, recipes):
+    """Insert every recipe whose name is not taken.
+
+    Names already stored (or repeated within ``recipes``) are skipped, so
+    running the same batch again is harmless. Each shard commits its part
+    in one transaction, written in parallel. In-memory structures catch
+    up once for the whole batch. Returns the number of recipes added.
+    """
+    by_name = {}
+    for recipe in recipes:
+        by_name.setdefault(recipe.name, recipe)
+    names = list(by_name)
+    taken = set().union(*fan_out(db, lambda s: _names_taken(s, names)))
+    groups = defaultdict(list)
+    for name, recipe in by_name.items():
+        if name not in taken:
+            session, row = _new_row(db, recipe)
+            groups[session].append(row)
+    if not groups:
+        return 0
+    if isinstance(db, ShardedSession):
+        parts = [groups.get(db.shard(i), []) for i in range(len(db))]
+    else:
+        parts = [groups[db]]
+    added = sum(fan_out(db, _insert_logged, parts))
+    _sync(db)
+    return added
+
+
 def update_recipe(db: Session, recipe_id: int, recipe: schemas.RecipeCreate):
+    session = session_for_id(db, recipe_id)
     db_recipe = get_recipe(db, recipe_id)
     if not db_recipe:
         return None
     db_recipe.name = recipe.name
     db_recipe.ingredients = json.dumps(recipe.ingredients or [])
     db_recipe.steps = json.dumps(recipe.steps or [])
-    db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    session.add(db_recipe)
+    changes.log(session, recipe_id)
+    session.commit()
+    session.refresh(db_recipe)
+    _sync(db)
     return db_recipe
 
 
 def delete_recipe(db: Session, recipe_id: int):
+    session = session_for_id(db, recipe_id)
     db_recipe = get_recipe(db, recipe_id)
     if not db_recipe:
         return False
-    db.delete(db_recipe)
-    db.commit()
+    session.delete(db_recipe)
+    changes.log(session, recipe_id)
+    session.commit()
+    _sync(db)
     return True
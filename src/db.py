@@ -1,12 +1,127 @@
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-DATABASE_URL = "sqlite:///./recipies.db"
+DATABASE_URL = os.environ.get(
+    "RECIPIES_DATABASE_URL", "sqlite:///./recipies.db"
+)
+# Number of SQLite files recipes are spread across; 1 keeps a single file
+SHARDS = int(os.environ.get("RECIPIES_SHARDS", "1"))
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def shard_url(url: str, shard: int) -> str:
+    """``sqlite:///./recipies.db`` -> ``sqlite:///./recipies-shard0.db``."""
+    base, ext = os.path.splitext(url)
+    if not url.startswith("sqlite:///") or not ext:
+        raise ValueError(f"cannot derive shard files from {url!r}")
+    return f"{base}-shard{shard}{ext}"
+
+
+class ShardedSession:
+    """Stands in for a Session when recipes are sharded.
+
+    Holds one Session per shard, opened on first use. A recipe lives on the
+    shard picked by hashing its name when it is created, and its id carries
+    that shard (``id % len(shards)``), so point reads route by id alone.
+    ``crud`` does the routing; see :func:`fan_out` for whole-catalog queries.
+    """
+
+    def __init__(self, factories):
+        self.factories = list(factories)
+        self._sessions = [None] * len(self.factories)
+
+    def __len__(self) -> int:
+        return len(self.factories)
+
+    def shard(self, index: int):
+        session = self._sessions[index]
+        if session is None:
+            session = self._sessions[index] = self.factories[index]()
+        return session
+
+    def shard_for_id(self, recipe_id: int) -> int:
+        return recipe_id % len(self)
+
+    def shard_for_name(self, name: str) -> int:
+        return zlib.crc32(name.encode("utf-8")) % len(self)
+
+    def close(self):
+        for session in self._sessions:
+            if session is not None:
+                session.close()
+
+
+class ShardedSessionFactory:
+    """Callable like a sessionmaker, returning ShardedSession objects."""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self.factories = [
+            sessionmaker(autocommit=False, autoflush=False, bind=e)
+            for e in self.engines
+        ]
+
+    def __call__(self) -> ShardedSession:
+        return ShardedSession(self.factories)
+
+
+def _engine(url: str):
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+if SHARDS > 1:
+    engines = [_engine(shard_url(DATABASE_URL, i)) for i in range(SHARDS)]
+    SessionLocal = ShardedSessionFactory(engines)
+else:
+    engines = [_engine(DATABASE_URL)]
+    SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=engines[0]
+    )
+engine = engines[0]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def fan_out(db, fn, args=None) -> list:
+    """Run ``fn(session)`` on every shard of ``db`` in parallel.
+
+    With ``args`` (one per shard), calls ``fn(session, arg)`` instead.
+    Results come back in shard order. A plain Session is one shard, so
+    callers can be written once for both storage modes.
+    """
+    global _pool
+    sharded = isinstance(db, ShardedSession)
+    args = None if args is None else list(args)
+
+    def call(i):
+        session = db.shard(i) if sharded else db
+        return fn(session) if args is None else fn(session, args[i])
+
+    if not sharded:
+        return [call(0)]
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(4, 2 * SHARDS),
+                thread_name_prefix="recipies-shard",
+            )
+    # each task only touches its own shard's Session
+    return list(_pool.map(call, range(len(db))))
+
+
+def session_for_id(db, recipe_id: int):
+    if isinstance(db, ShardedSession):
+        return db.shard(db.shard_for_id(recipe_id))
+    return db
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    for e in engines:
+        Base.metadata.create_all(bind=e)
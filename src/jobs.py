@@ -0,0 +1,384 @@
+"""In-process background jobs: catalog import and full reindex.
+
+Jobs run on a small bounded thread pool, off the event loop, and work in
+chunks. An import commits each chunk as its own transaction; a reindex
+appends each chunk to a fresh catalog and similarity index that are not
+serving yet. Either way a job can be cancelled at any chunk boundary and
+resumed later from where it stopped.
+
+A reindex swaps the fresh structures in only once they are complete, so
+requests keep reading the current ones at full speed meanwhile, and the
+``recipe_changes`` log replays whatever was written during the build.
+Search and match are both served by the catalog; there is no separate
+autocomplete structure to rebuild.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import ValidationError
+from . import catalog, changes, crud, schemas, similar
+from .db import SessionLocal
+
+MAX_WORKERS = int(os.environ.get("RECIPIES_JOB_WORKERS", "2"))
+CHUNK_SIZE = 1000
+# finished jobs kept for the status API; older ones are forgotten
+KEEP_FINISHED = 50
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLED = "cancelled"
+FAILED = "failed"
+DONE = "done"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """State, progress and resume point of one background job."""
+
+    def __init__(self, kind: str, params: dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.state = QUEUED
+        self.error = None
+        self.result: dict = {}
+        self.phases: List[str] = list(PHASES[kind])
+        self.phase = self.phases[0]
+        self.processed = 0
+        self.total = 0
+        # whatever the job function needs to carry on after a cancel
+        self.checkpoint = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._rate_start = time.monotonic()
+        self._rate_base = 0
+        self._rate = 0.0
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    # called from the job function
+
+    def start_phase(self, phase: str, total: int):
+        """Enter ``phase``; progress is kept when resuming the same phase."""
+        if phase != self.phase:
+            self.phase = phase
+            self.processed = 0
+        self.total = total
+        self._rate_start = time.monotonic()
+        self._rate_base = self.processed
+
+    def advance(self, n: int):
+        self.processed += n
+
+    def cancel(self):
+        """Ask the job to stop at its next chunk boundary."""
+        self._cancel.set()
+
+    def check(self):
+        """Raise JobCancelled if a cancel was requested."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    # state changes, called by `run`
+
+    def _begin(self):
+        self.state = RUNNING
+        self.error = None
+        if self.started_at is None:
+            self.started_at = time.time()
+        self._rate_start = time.monotonic()
+        self._rate_base = self.processed
+
+    def _finish(self, state: str, error: Optional[str] = None):
+        self._rate = self.rows_per_sec()
+        self.state = state
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+    # reading
+
+    def rows_per_sec(self) -> float:
+        if self.state != RUNNING:
+            return self._rate
+        elapsed = time.monotonic() - self._rate_start
+        return (self.processed - self._rate_base) / elapsed if elapsed > 0 else 0.0
+
+    def progress(self) -> float:
+        if self.state == DONE:
+            return 1.0
+        step = min(self.processed / self.total, 1.0) if self.total else 0.0
+        return (self.phases.index(self.phase) + step) / len(self.phases)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job stops running; False on timeout."""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "phase": self.phase,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": round(self.progress(), 4),
+            "rows_per_sec": round(self.rows_per_sec(), 1),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# Import
+
+def resolve_data_path(name: str) -> Path:
+    """Resolve ``name`` inside DATA_DIR, refusing anything outside it."""
+    path = (DATA_DIR / name).resolve()
+    if DATA_DIR.resolve() not in path.parents:
+        raise ValueError("path must name a file under data/")
+    if path.suffix not in (".json", ".jsonl"):
+        raise ValueError("only .json and .jsonl files can be imported")
+    if not path.is_file():
+        raise FileNotFoundError(name)
+    return path
+
+
+def _read_records(path: Path, skip: int):
+    """Return (record count, iterator over records after the first ``skip``).
+
+    ``.jsonl`` files (one recipe object per line) are streamed, so very
+    large imports never sit in memory; ``.json`` holds a single list.
+    """
+    if path.suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return len(data), iter(data[skip:])
+    with path.open(encoding="utf-8") as f:
+        total = sum(1 for line in f if line.strip())
+
+    def records():
+        seen = 0
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                seen += 1
+                if seen > skip:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # counted as skipped, like any other unusable record
+                        yield None
+    return total, records()
+
+
+def _recipe_in(raw) -> Optional[schemas.RecipeCreate]:
+    if not isinstance(raw, dict) or not raw.get("name"):
+        return None
+    try:
+        return schemas.RecipeCreate(**raw)
+    except (ValidationError, TypeError):
+        return None
+
+
+def _chunks(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_import(job: Job, session_factory):
+    """Insert recipes from a data file, one committed chunk at a time.
+
+    The resume point is the number of records already processed; names
+    that already exist are skipped, so replaying a chunk is harmless.
+    """
+    path = resolve_data_path(job.params.get("path", "recipes.json"))
+    chunk_size = job.params.get("chunk_size") or CHUNK_SIZE
+    total, records = _read_records(path, job.processed)
+    job.start_phase("import", total)
+    job.result.setdefault("added", 0)
+    job.result.setdefault("skipped", 0)
+    db = session_factory()
+    try:
+        for chunk in _chunks(records, chunk_size):
+            job.check()
+            batch = [r for r in (_recipe_in(raw) for raw in chunk) if r is not None]
+            added = crud.create_recipes_bulk(db, batch)
+            job.result["added"] += added
+            job.result["skipped"] += len(chunk) - added
+            job.advance(len(chunk))
+    finally:
+        db.close()
+
+
+# Reindex
+
+def run_reindex(job: Job, session_factory):
+    """Build a fresh catalog and similarity index, then swap them in.
+
+    The checkpoint holds the half-built structures and the last recipe id
+    read, so a resumed job continues the scan instead of starting over.
+    """
+    chunk_size = job.params.get("chunk_size") or CHUNK_SIZE
+    db = session_factory()
+    try:
+        if job.checkpoint is None:
+            fresh_catalog = catalog.Catalog()
+            fresh_index = similar.SimilarityIndex()
+            # read the mark first: anything written during the build is replayed
+            fresh_catalog.last_change = fresh_index.last_change = changes.last_change_id(db)
+            job.checkpoint = {
+                "catalog": fresh_catalog, "index": fresh_index,
+                "last_id": 0, "scanned": False, "ranked": 0,
+            }
+        cp = job.checkpoint
+
+        if not cp["scanned"]:
+            job.start_phase("scan", crud.count_recipes(db))
+        while not cp["scanned"]:
+            job.check()
+            rows = changes.rows_after(db, cp["last_id"], chunk_size)
+            if not rows:
+                cp["scanned"] = True
+                break
+            cp["catalog"].append_rows(rows)
+            cp["index"].add_many((row[0], similar.parse_ingredients(row[2])) for row in rows)
+            cp["last_id"] = rows[-1][0]
+            job.advance(len(rows))
+
+        ids = cp["index"].ids()
+        job.start_phase("neighbours", len(ids))
+        while cp["ranked"] < len(ids):
+            job.check()
+            batch = ids[cp["ranked"]:cp["ranked"] + chunk_size]
+            cp["index"].recompute(batch)
+            cp["ranked"] += len(batch)
+            job.advance(len(batch))
+
+        catalog.install(cp["catalog"], db)
+        similar.install(cp["index"], db)
+        job.result = {"recipes": len(ids)}
+        job.checkpoint = None
+    finally:
+        db.close()
+
+
+KINDS = {"import": run_import, "reindex": run_reindex}
+PHASES = {"import": ["import"], "reindex": ["scan", "neighbours"]}
+
+
+def run(job: Job, session_factory):
+    """Run ``job`` to completion, cancellation or failure in this thread."""
+    if job._cancel.is_set():
+        job._finish(CANCELLED)
+        return
+    job._begin()
+    try:
+        KINDS[job.kind](job, session_factory)
+    except JobCancelled:
+        job._finish(CANCELLED)
+    except Exception as exc:
+        job._finish(FAILED, f"{type(exc).__name__}: {exc}")
+    else:
+        job._finish(DONE)
+
+
+class JobRunner:
+    """Runs jobs on a bounded pool of worker threads and tracks them."""
+
+    def __init__(self, session_factory, max_workers: int = MAX_WORKERS):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self._executor = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, **params) -> Job:
+        """Queue a new job. A reindex already queued or running is reused."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown job kind {kind!r}")
+        with self._lock:
+            if kind == "reindex":
+                for job in self._jobs.values():
+                    if job.kind == kind and job.state in ACTIVE:
+                        return job
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+            self._prune()
+        self._start(job)
+        return job
+
+    def _start(self, job: Job):
+        job.state = QUEUED
+        job._cancel.clear()
+        job._done.clear()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="recipies-job",
+                )
+            self._executor.submit(run, job, self.session_factory)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.state not in ACTIVE]
+        for job in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """All tracked jobs, newest first."""
+        return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop at its next chunk boundary."""
+        job = self._jobs.get(job_id)
+        if job is not None and job.state in ACTIVE:
+            job.cancel()
+        return job
+
+    def resume(self, job_id: str) -> Optional[Job]:
+        """Requeue a cancelled or failed job from its checkpoint."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.state not in (CANCELLED, FAILED):
+            raise ValueError(f"job is {job.state}")
+        self._start(job)
+        return job
+
+    def shutdown(self):
+        """Cancel running jobs and wait for the workers to stop."""
+        for job in list(self._jobs.values()):
+            if job.state in ACTIVE:
+                job.cancel()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# Process-wide runner used by the app
+runner = JobRunner(SessionLocal)
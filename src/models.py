@@ -9,3 +9,15 @@ class Recipe(Base):
     name = Column(String(200), unique=True, index=True, nullable=False)
     ingredients = Column(Text, nullable=True)  # JSON-encoded list
     steps = Column(Text, nullable=True)  # JSON-encoded list
+
+
+class RecipeChange(Base):
+    """Append-only log of recipe writes.
+
+    In-memory read structures (catalog, similarity index) remember the last
+    change id they applied and catch up from here, which keeps every worker
+    process in sync with writes made by any other process.
+    """
+    __tablename__ = "recipe_changes"
+    id = Column(Integer, primary_key=True)
+    recipe_id = Column(Integer, nullable=False)
@@ -0,0 +1,251 @@
+"""Opt-in profiling for slow requests.
+
+Two modes, both off by default and configured through environment variables:
+
+* Per-request: when ``RECIPIES_PROFILE_SECRET`` is set, a request carrying a
+  matching ``X-Profile`` header is profiled. Every SQL statement it issues is
+  recorded, endpoints wrapped with :func:`profiled` run under cProfile, and
+  the report (SQL, time in ``normalize_ingredient``, ``json.loads`` and
+  template rendering, top functions) is written to ``RECIPIES_PROFILE_DIR``.
+  The response carries an ``X-Profile-Id`` header naming the stored report.
+* Sampling: when ``RECIPIES_SAMPLE_INTERVAL_MS`` is set, a daemon thread
+  samples all thread stacks at that interval and periodically writes them
+  aggregated in the folded format read by flamegraph.pl and speedscope.
+"""
+import cProfile
+import contextvars
+import functools
+import hmac
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_SECRET = os.environ.get("RECIPIES_PROFILE_SECRET")
+PROFILE_DIR = os.environ.get("RECIPIES_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL_MS = float(os.environ.get("RECIPIES_SAMPLE_INTERVAL_MS", "0"))
+SAMPLE_DUMP_SECONDS = 30.0
+# stored request reports beyond this many are deleted, oldest first
+MAX_REPORTS = int(os.environ.get("RECIPIES_PROFILE_KEEP", "100"))
+PROFILE_HEADER = "x-profile"
+
+# (label, file suffix, function name) of the hotspots broken out in reports
+HOTSPOTS = [
+    ("normalize_ingredient", "normalize.py", "normalize_ingredient"),
+    ("json.loads", os.path.join("json", "__init__.py"), "loads"),
+    ("template_render", os.path.join("jinja2", "environment.py"), "render"),
+]
+
+_current = contextvars.ContextVar("recipies_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.sql = []
+        self.stats = None
+
+    def report(self, total_s: float, status: int) -> dict:
+        data = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "total_ms": round(total_s * 1000, 3),
+            "sql": self.sql,
+            "sql_ms": round(sum(q["ms"] for q in self.sql), 3),
+        }
+        if self.stats is not None:
+            data["hotspots"] = _hotspots(self.stats)
+            out = io.StringIO()
+            self.stats.stream = out
+            self.stats.sort_stats("cumulative").print_stats(25)
+            data["top"] = out.getvalue()
+        return data
+
+
+def _hotspots(stats: pstats.Stats) -> dict:
+    found = {label: {"calls": 0, "cumulative_ms": 0.0} for label, _, _ in HOTSPOTS}
+    for (filename, _, funcname), (_, ncalls, _, cumtime, _) in stats.stats.items():
+        for label, suffix, name in HOTSPOTS:
+            if funcname == name and filename.endswith(suffix):
+                found[label]["calls"] += ncalls
+                found[label]["cumulative_ms"] += cumtime * 1000
+    for v in found.values():
+        v["cumulative_ms"] = round(v["cumulative_ms"], 3)
+    return found
+
+
+def profiled(fn):
+    """Run ``fn`` under cProfile when the current request is being profiled.
+
+    Sync endpoints execute in a worker thread and cProfile only sees the
+    thread that enabled it, so the profiler has to start inside the endpoint.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        prof = _current.get()
+        if prof is None:
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            prof.stats = pstats.Stats(profiler)
+    return wrapper
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("recipies_profile_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    prof = _current.get()
+    starts = conn.info.get("recipies_profile_start")
+    if prof is None or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    prof.sql.append({
+        "statement": statement,
+        "parameters": repr(parameters),
+        "ms": round(elapsed * 1000, 3),
+    })
+
+
+def save_report(report: dict) -> Path:
+    """Write a request report and prune the oldest beyond MAX_REPORTS."""
+    out = Path(PROFILE_DIR)
+    out.mkdir(parents=True, exist_ok=True)
+    path = out / f"request-{report['id']}.json"
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    stored = sorted(out.glob("request-*.json"), key=lambda p: p.stat().st_mtime)
+    for old in stored[:max(0, len(stored) - MAX_REPORTS)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def load_report(profile_id: str):
+    # ids are uuid4 hex; anything else cannot name a stored report
+    if not profile_id.isalnum():
+        return None
+    path = Path(PROFILE_DIR) / f"request-{profile_id}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def is_authorized(headers) -> bool:
+    """True if profiling is enabled and ``headers`` carry the secret."""
+    if not PROFILE_SECRET:
+        return False
+    for key, value in headers:
+        if key.decode("latin-1").lower() == PROFILE_HEADER:
+            return hmac.compare_digest(value, PROFILE_SECRET.encode("utf-8"))
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests authorized by the header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_authorized(scope.get("headers", [])):
+            await self.app(scope, receive, send)
+            return
+
+        prof = RequestProfile(scope["method"], scope["path"])
+        status = {"code": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", prof.id.encode("ascii")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        token = _current.set(prof)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            report = prof.report(time.perf_counter() - start, status["code"])
+            # file I/O stays off the event loop
+            await anyio.to_thread.run_sync(save_report, report)
+
+
+class StackSampler:
+    """Low-overhead sampler aggregating folded stacks for flame graphs."""
+
+    def __init__(self, interval_ms: float, path: Path, dump_seconds: float = SAMPLE_DUMP_SECONDS):
+        self.interval = interval_ms / 1000.0
+        self.path = Path(path)
+        self.dump_seconds = dump_seconds
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.dump()
+
+    def sample(self):
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+
+    def dump(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        next_dump = time.monotonic() + self.dump_seconds
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if time.monotonic() >= next_dump:
+                self.dump()
+                next_dump = time.monotonic() + self.dump_seconds
+
+
+def start_sampler():
+    """Start the sampler if configured; returns it (or None)."""
+    if SAMPLE_INTERVAL_MS <= 0:
+        return None
+    sampler = StackSampler(SAMPLE_INTERVAL_MS, Path(PROFILE_DIR) / f"stacks-{os.getpid()}.folded")
+    sampler.start()
+    return sampler
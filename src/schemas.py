@@ -39,3 +39,23 @@ class Recipe(RecipeBase):
     else:
         class Config:
             orm_mode = True
+
+
+class MatchRequest(BaseModel):
+    ingredients: List[str] = Field(
+        default_factory=list,
+        json_schema_extra={"example": ["egg", "flour", "milk"]},
+    )
+
+
+class ImportJobRequest(BaseModel):
+    path: str = Field(
+        "recipes.json",
+        description="JSON list or JSON Lines file under data/",
+        json_schema_extra={"example": "recipes.jsonl"},
+    )
+    chunk_size: int = Field(1000, ge=1, le=50000)
+
+
+class ReindexJobRequest(BaseModel):
+    chunk_size: int = Field(1000, ge=1, le=50000)
@@ -0,0 +1,340 @@
+"""Precomputed "similar recipes" using MinHash/LSH over ingredient sets.
+
+Each recipe's normalized ingredient set is reduced to a MinHash signature.
+Signatures are split into bands and hashed into LSH buckets, so only recipes
+sharing a bucket are compared. The top-N neighbours of every recipe are kept
+precomputed and refreshed incrementally when a recipe is written, which makes
+lookups a dict access instead of a scan over the catalog.
+
+Per-recipe memory is kept small: ingredient sets are sorted ``array('I')``
+of interned token ids, each band is stored as one hashed int, a bucket
+holding a single recipe stores the bare id instead of a set, and neighbour
+lists are ``array('I')`` of ids whose scores are recomputed on read.
+Signatures are not kept; they are recomputed from the token set when a
+recipe is replaced or removed.
+"""
+import json
+import random
+import threading
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Set, Tuple
+
+from . import changes
+from .normalize import normalize_ingredient
+
+NUM_PERM = 30
+BANDS = 10  # 10 bands x 3 rows: candidate threshold around Jaccard 0.46
+TOP_N = 5
+# recipes kept per bucket. Bounds the candidates compared per write, so
+# piles of near-identical recipes cannot make updates quadratic; a recipe
+# turned away by every one of its buckets simply has no neighbours.
+BUCKET_CAP = 30
+CHUNK_SIZE = 2000
+
+# Mersenne prime larger than any 32-bit token hash
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def ingredient_set(ingredients: Iterable[str]) -> Set[str]:
+    return set(n for n in (normalize_ingredient(i) for i in ingredients) if n)
+
+
+def token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def minhash(hashes: Iterable[int], perms=_PERMS) -> Tuple[int, ...]:
+    """Return the MinHash signature of a set of 32-bit token hashes."""
+    hashes = list(hashes)
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in perms)
+
+
+def jaccard(a, b) -> float:
+    """Jaccard similarity of two collections of distinct items."""
+    if not a or not b:
+        return 0.0
+    inter = len(set(a).intersection(b))
+    return inter / (len(a) + len(b) - inter)
+
+
+class SimilarityIndex:
+    """LSH buckets plus precomputed top-N neighbour lists."""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, top_n: int = TOP_N):
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.top_n = top_n
+        self._perms = _PERMS[:num_perm]
+        self._lock = threading.RLock()
+        self._reset()
+        # mark of the last recipe_changes row applied
+        self.last_change = 0
+
+    def _reset(self):
+        self._token_ids: Dict[str, int] = {}
+        # per token, its hash under every permutation; a recipe's signature
+        # is the element-wise min over its tokens
+        self._token_perms: List[array] = []
+        self._sets: Dict[int, array] = {}
+        # band key -> recipe id, or a set of ids once shared
+        self._buckets: Dict[int, object] = {}
+        self._neighbours: Dict[int, array] = {}
+
+    def _tokens(self, ingredients: Iterable[str]) -> array:
+        ids = []
+        for token in ingredient_set(ingredients):
+            i = self._token_ids.get(token)
+            if i is None:
+                i = self._token_ids[token] = len(self._token_perms)
+                h = token_hash(token)
+                self._token_perms.append(array("Q", [(a * h + b) % _PRIME for a, b in self._perms]))
+            ids.append(i)
+        return array("I", sorted(ids))
+
+    def _signature(self, tokens: array) -> Tuple[int, ...]:
+        """Same as :func:`minhash` over the tokens, without re-hashing."""
+        cols = [self._token_perms[t] for t in tokens]
+        if len(cols) < 2:
+            return tuple(cols[0]) if cols else ()
+        return tuple(map(min, *cols))
+
+    def _band_keys(self, tokens: array) -> List[int]:
+        sig = self._signature(tokens)
+        r = self.rows
+        return [hash((b,) + sig[b * r:(b + 1) * r]) for b in range(self.bands)] if sig else []
+
+    def _candidates(self, recipe_id: int) -> Set[int]:
+        """Recipes sharing a bucket that ``recipe_id`` is a member of.
+
+        Only shared membership counts, so the relation stays symmetric
+        even when a full bucket turned a recipe away.
+        """
+        found = set()
+        for key in self._band_keys(self._sets[recipe_id]):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, set) and recipe_id in bucket:
+                found |= bucket
+        found.discard(recipe_id)
+        return found
+
+    def _scores(self, recipe_id: int, others: Iterable[int]) -> List[float]:
+        """Jaccard similarity of ``recipe_id`` to each of ``others``."""
+        mine = set(self._sets[recipe_id])
+        n = len(mine)
+        scores = []
+        for other in others:
+            theirs = self._sets[other]
+            inter = len(mine.intersection(theirs))
+            scores.append(inter / (n + len(theirs) - inter) if inter else 0.0)
+        return scores
+
+    def _set_neighbours(self, recipe_id: int, ids: List[int]):
+        if ids:
+            self._neighbours[recipe_id] = array("I", ids)
+        else:
+            self._neighbours.pop(recipe_id, None)
+
+    def _recompute(self, recipe_id: int):
+        others = list(self._candidates(recipe_id))
+        scored = [
+            (-score, other)
+            for score, other in zip(self._scores(recipe_id, others), others)
+            if score > 0
+        ]
+        # best first; ties broken by id so results are stable
+        scored.sort()
+        self._set_neighbours(recipe_id, [other for _, other in scored[:self.top_n]])
+
+    def _offer(self, recipe_id: int, other: int):
+        """Insert `other` into recipe_id's list if it ranks in the top N."""
+        current = self._neighbours.get(recipe_id, ())
+        if len(current) >= self.top_n:
+            # lists are best first: beating the last entry is enough
+            score, worst = self._scores(recipe_id, (other, current[-1]))
+            if score <= 0 or (-score, other) > (-worst, current[-1]):
+                return
+        elif self._scores(recipe_id, (other,))[0] <= 0:
+            return
+        ids = list(current) + [other]
+        ranked = sorted(zip((-s for s in self._scores(recipe_id, ids)), ids))
+        self._set_neighbours(recipe_id, [o for _, o in ranked[:self.top_n]])
+
+    def _link(self, recipe_id: int, ingredients: Iterable[str]):
+        tokens = self._tokens(ingredients)
+        self._sets[recipe_id] = tokens
+        for key in self._band_keys(tokens):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = recipe_id
+            elif isinstance(bucket, set):
+                if len(bucket) < BUCKET_CAP:
+                    bucket.add(recipe_id)
+            elif bucket != recipe_id:
+                self._buckets[key] = {bucket, recipe_id}
+
+    def _unlink(self, recipe_id: int) -> Set[int]:
+        """Drop a recipe from the index; return ids whose lists it was in."""
+        # neighbours only ever come from shared buckets, so only current
+        # candidates can hold this recipe in their lists
+        stale = set(
+            rid for rid in self._candidates(recipe_id)
+            if recipe_id in self._neighbours.get(rid, ())
+        )
+        for key in self._band_keys(self._sets[recipe_id]):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, set):
+                bucket.discard(recipe_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket.pop()
+            elif bucket == recipe_id:
+                del self._buckets[key]
+        self._neighbours.pop(recipe_id, None)
+        del self._sets[recipe_id]
+        return stale
+
+    def update_many(self, upserts: Dict[int, Iterable[str]], removals: Iterable[int] = ()):
+        """Apply a batch of writes and refresh the neighbour lists they touch.
+
+        Lists that referenced an old version are recomputed, as are the
+        written recipes' own lists; every other candidate only needs the new
+        versions offered to its current list. Done once per batch, so a
+        bulk import costs one pass rather than a full refresh per row.
+        """
+        with self._lock:
+            written = set(upserts).union(removals)
+            stale = set()
+            for rid in written:
+                if rid in self._sets:
+                    stale |= self._unlink(rid)
+            for rid, ingredients in upserts.items():
+                self._link(rid, ingredients)
+            stale -= written
+            for rid in upserts:
+                self._recompute(rid)
+            for rid in stale:
+                if rid in self._sets:
+                    self._recompute(rid)
+            for rid in upserts:
+                for other in self._candidates(rid) - stale - written:
+                    self._offer(other, rid)
+
+    def upsert(self, recipe_id: int, ingredients: Iterable[str]):
+        """Add or replace a single recipe."""
+        self.update_many({recipe_id: ingredients})
+
+    def remove(self, recipe_id: int):
+        self.update_many({}, [recipe_id])
+
+    def add_many(self, items: Iterable[Tuple[int, Iterable[str]]]):
+        """Bucket new recipes without refreshing any neighbour lists.
+
+        For an index that is not serving yet; finish with
+        :meth:`recompute_all` once every recipe is in.
+        """
+        with self._lock:
+            for recipe_id, ingredients in items:
+                self._link(recipe_id, ingredients)
+
+    def recompute(self, recipe_ids: Iterable[int]):
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._recompute(recipe_id)
+
+    def recompute_all(self):
+        self.recompute(list(self._sets))
+
+    def ids(self) -> List[int]:
+        return sorted(self._sets)
+
+    def rebuild(self, items: Iterable[Tuple[int, Iterable[str]]]):
+        """Replace the whole index from (recipe_id, ingredients) pairs."""
+        with self._lock:
+            self._reset()
+            self.add_many(items)
+            self.recompute_all()
+
+    def neighbours(self, recipe_id: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            ids = self._neighbours.get(recipe_id, ())
+            return list(zip(ids, self._scores(recipe_id, ids))) if ids else []
+
+    def __contains__(self, recipe_id: int) -> bool:
+        return recipe_id in self._sets
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+
+# Process-wide index, swapped in whole by `rebuild_from_db` and kept current
+# by `sync`. None until the first build has finished.
+index = None
+_sync_lock = threading.Lock()
+
+
+def parse_ingredients(raw) -> list:
+    try:
+        return json.loads(raw or "[]")
+    except Exception:
+        return []
+
+
+def sync(db) -> bool:
+    """Apply recipe writes logged since the index last caught up."""
+    idx = index
+    if idx is None or changes.caught_up(db, idx.last_change):
+        return False
+    with _sync_lock:
+        idx = index
+        latest, ids = changes.changed_since(db, idx.last_change)
+        if not ids:
+            return False
+        upserts = {row[0]: parse_ingredients(row[2]) for row in changes.fetch_rows(db, ids)}
+        idx.update_many(upserts, ids - set(upserts))
+        idx.last_change = latest
+    return True
+
+
+def build_from_db(db, chunk_size: int = CHUNK_SIZE) -> SimilarityIndex:
+    """Build a new index from every recipe, reading in id-ordered chunks."""
+    fresh = SimilarityIndex()
+    # read the mark first: anything written during the scan is replayed
+    fresh.last_change = changes.last_change_id(db)
+    last_id = 0
+    while True:
+        rows = changes.rows_after(db, last_id, chunk_size)
+        if not rows:
+            break
+        fresh.add_many((row[0], parse_ingredients(row[2])) for row in rows)
+        last_id = rows[-1][0]
+    fresh.recompute_all()
+    return fresh
+
+
+def install(fresh: SimilarityIndex, db=None):
+    """Swap ``fresh`` in as the process-wide index and catch it up."""
+    global index
+    with _sync_lock:
+        index = fresh
+    if db is not None:
+        sync(db)
+
+
+def rebuild_from_db(session_factory):
+    """Build a new index off to the side, then swap it in.
+
+    Meant for a background thread: requests keep being served meanwhile
+    (similar recipes answer 503 until the first build lands).
+    """
+    db = session_factory()
+    try:
+        install(build_from_db(db), db)
+    finally:
+        db.close()
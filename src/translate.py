@@ -1,4 +1,5 @@
-from typing import List
+from collections import deque
+from typing import Dict, List, Tuple
 
 # Very small built-in translation dictionaries for demo purposes.
 # Keys are language codes (ISO 639-1) -> mapping of English phrase ->
@@ -17,6 +18,20 @@ TRANSLATIONS = {
         "flour": "mąka",
         "milk": "mleko",
         "sugar": "cukier",
+        "tomatoes": "pomidory",
+        "eggs": "jajka",
+        "butter": "masło",
+        "stock": "bulion",
+        "baking powder": "proszek do pieczenia",
+        "olive oil": "oliwa z oliwek",
+        # common step words
+        "add": "dodaj",
+        "mix": "wymieszaj",
+        "cook": "gotuj",
+        "bake": "piecz",
+        "serve": "podaj",
+        "chopped": "posiekane",
+        "and": "i",
     },
     "es": {
         "Ingredients": "Ingredientes",
@@ -27,10 +42,31 @@ TRANSLATIONS = {
         "tomato": "tomate",
         "salt": "sal",
         "egg": "huevo",
+        "flour": "harina",
+        "milk": "leche",
+        "sugar": "azúcar",
+        "tomatoes": "tomates",
+        "eggs": "huevos",
+        "butter": "mantequilla",
+        "stock": "caldo",
+        "baking powder": "levadura en polvo",
+        "olive oil": "aceite de oliva",
+        "add": "añade",
+        "mix": "mezcla",
+        "cook": "cocina",
+        "bake": "hornea",
+        "serve": "sirve",
+        "chopped": "picados",
+        "and": "y",
     }
 }
 
 
+# UI labels are only translated as whole strings (headings, buttons); inside
+# step text "back" or "steps" are ordinary words, not labels.
+LABELS = frozenset(["Ingredients", "Steps", "Back", "Edit", "Delete"])
+
+
 def translate_text(text: str, lang: str) -> str:
     if not lang:
         return text
@@ -53,7 +89,139 @@ def translate_text(text: str, lang: str) -> str:
     return text
 
 
+class PhraseMatcher:
+    """Aho-Corasick automaton over one language's catalog.
+
+    Phrases are matched case-insensitively on word boundaries and the
+    longest match starting leftmost wins, so a whole step is translated in
+    a single pass over its characters regardless of catalog size.
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # phrase length and replacement for nodes that end a phrase
+        self.out: List[Tuple[int, str] | None] = [None]
+        # nearest proper suffix node that ends a phrase
+        self.dict_link: List[int] = [0]
+        for key, value in mapping.items():
+            self._add(key.lower(), value)
+        self._link()
+
+    def _add(self, phrase: str, value: str):
+        node = 0
+        for ch in phrase:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(None)
+                self.dict_link.append(0)
+            node = nxt
+        # first entry wins when two keys differ only by case
+        if self.out[node] is None:
+            self.out[node] = (len(phrase), value)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                fc = self.fail[child]
+                if self.out[fc] is not None:
+                    self.dict_link[child] = fc
+                else:
+                    self.dict_link[child] = self.dict_link[fc]
+                queue.append(child)
+
+    def translate(self, text: str) -> str:
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # lowering changed offsets (rare Unicode); match as written
+            lowered = text
+        n = len(text)
+        # longest phrase (end, replacement) for every start offset
+        best: List[Tuple[int, str] | None] = [None] * n
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            end = i + 1
+            if end < n and _is_word(text[end]):
+                continue
+            hit = node if self.out[node] is not None else self.dict_link[node]
+            while hit:
+                length, value = self.out[hit]
+                start = end - length
+                if start == 0 or not _is_word(text[start - 1]):
+                    if best[start] is None or end > best[start][0]:
+                        best[start] = (end, value)
+                hit = self.dict_link[hit]
+
+        parts = []
+        i = 0
+        copied = 0
+        while i < n:
+            if best[i] is None:
+                i += 1
+                continue
+            end, value = best[i]
+            parts.append(text[copied:i])
+            parts.append(_match_case(text[i], value))
+            i = copied = end
+        parts.append(text[copied:])
+        return "".join(parts)
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _match_case(first: str, value: str) -> str:
+    # "Tomato" -> "Pomidor": keep a capitalized source capitalized
+    if first.isupper() and value[:1].islower():
+        return value[:1].upper() + value[1:]
+    return value
+
+
+_MATCHERS: Dict[str, PhraseMatcher] = {}
+
+
+def _matcher(lang: str) -> PhraseMatcher | None:
+    matcher = _MATCHERS.get(lang)
+    if matcher is None:
+        mapping = TRANSLATIONS.get(lang)
+        if not mapping:
+            return None
+        phrases = {k: v for k, v in mapping.items() if k not in LABELS}
+        matcher = _MATCHERS[lang] = PhraseMatcher(phrases)
+    return matcher
+
+
+def translate_phrases(text: str, lang: str) -> str:
+    """Translate every known phrase inside ``text``.
+
+    Unlike :func:`translate_text`, which needs the whole string to be a
+    catalog key, this translates e.g. "Add chopped tomatoes and stock"
+    phrase by phrase and leaves unknown words untouched.
+    """
+    if not lang or not text:
+        return text
+    matcher = _matcher(lang.lower())
+    if matcher is None:
+        return text
+    return matcher.translate(text)
+
+
 def translate_list(items: List[str], lang: str) -> List[str]:
     if not lang:
         return items
-    return [translate_text(i, lang) for i in items]
+    return [translate_phrases(i, lang) for i in items]
@@ -0,0 +1,35 @@
+# flake8: noqa
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `src` can be imported when tests are run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import sessionmaker
+
+from src import app as app_module
+from src import models
+
+
+# Every test module talks to an in-memory database, never ./recipies.db,
+# whichever of them is imported (or run) first.
+engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+models.Base.metadata.create_all(bind=engine)
+
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+app_module.app.dependency_overrides[app_module.get_db] = override_get_db
@@ -245,3 +245,84 @@ def test_match_synonyms_and_plural():
     assert "EggplantDish" in names and names["EggplantDish"]["match"] is True
     assert "TomatoSalad" in names and names["TomatoSalad"]["match"] is True
 
+
+
+def test_similar_recipes_api():
+    from src import similar
+
+    similar.install(None)
+    assert client.get("/api/recipes/1/similar").status_code == 503
+    similar.rebuild_from_db(TestingSessionLocal)
+
+    a = client.post("/api/recipes", json={"name": "SimCrepes", "ingredients": ["egg", "flour", "milk", "sugar"], "steps": ["mix"]}).json()
+    b = client.post("/api/recipes", json={"name": "SimPancakes", "ingredients": ["eggs", "flour", "milk", "sugar"], "steps": ["fry"]}).json()
+
+    res = client.get(f"/api/recipes/{a['id']}/similar")
+    assert res.status_code == 200
+    items = res.json()["items"]
+    assert items and items[0]["id"] == b["id"]
+
+    # editing the neighbour away refreshes the precomputed list
+    client.put(f"/api/recipes/{b['id']}", json={"name": "SimPancakes", "ingredients": ["rice"], "steps": ["fry"]})
+    items = client.get(f"/api/recipes/{a['id']}/similar").json()["items"]
+    assert all(it["id"] != b["id"] for it in items)
+
+    assert client.get("/api/recipes/999999/similar").status_code == 404
+
+
+def test_read_paths_served_from_catalog():
+    from src import catalog
+
+    db = TestingSessionLocal()
+    db.add(models.Recipe(name="CatalogOnlyDish", ingredients=json.dumps(["rice", "eggs"]), steps=json.dumps(["boil"])))
+    db.commit()
+    catalog.store.load(db)
+    db.close()
+    try:
+        res = client.get("/api/recipes?q=CatalogOnly&page=1&page_size=10")
+        data = res.json()
+        assert data["total"] == 1
+        assert data["items"][0]["ingredients"] == ["rice", "eggs"]
+
+        # writes through crud are visible without reloading
+        client.post("/api/recipes", json={"name": "CatalogWritten", "ingredients": ["rice"], "steps": ["boil"]})
+        assert client.get("/api/recipes?q=CatalogWritten").json()["total"] == 1
+
+        res = client.post("/api/match", json={"ingredients": ["rice", "egg"]})
+        found = next((r for r in res.json()["results"] if r["name"] == "CatalogOnlyDish"), None)
+        assert found is not None and found["match"] is True
+    finally:
+        catalog.store.unload()
+
+
+def test_catalog_sees_writes_from_other_processes():
+    from src import catalog, changes
+
+    db = TestingSessionLocal()
+    catalog.store.load(db)
+    db.close()
+    try:
+        # another worker (or scripts/import_data.py) writes through its own
+        # session; only the change log connects it to this process
+        other = TestingSessionLocal()
+        r = models.Recipe(name="OtherWorkerDish", ingredients=json.dumps(["rice"]), steps=json.dumps(["boil"]))
+        other.add(r)
+        other.flush()
+        changes.log(other, r.id)
+        other.commit()
+        rid = r.id
+        assert client.get("/api/recipes?q=OtherWorker").json()["total"] == 1
+
+        r.name = "OtherWorkerRenamed"
+        changes.log(other, rid)
+        other.commit()
+        items = client.get("/api/recipes?q=OtherWorker").json()["items"]
+        assert [it["name"] for it in items] == ["OtherWorkerRenamed"]
+
+        other.delete(r)
+        changes.log(other, rid)
+        other.commit()
+        other.close()
+        assert client.get("/api/recipes?q=OtherWorker").json()["total"] == 0
+    finally:
+        catalog.store.unload()
@@ -0,0 +1,69 @@
+# flake8: noqa
+import sys
+import json
+from pathlib import Path
+
+# Ensure project root is on sys.path so `src` can be imported when tests are run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
+
+from src.catalog import Catalog
+
+
+def _row(rid, name, ingredients, steps=("mix",)):
+    return (rid, name, json.dumps(list(ingredients)), json.dumps(list(steps)))
+
+
+def test_records_intern_ingredients():
+    cat = Catalog()
+    cat.load_rows([
+        _row(1, "Pancakes", ["flour", "eggs", "milk"]),
+        _row(2, "Omelette", ["egg", "milk"]),
+    ])
+    a, b = cat.page()
+    # "eggs" normalizes to "egg", which shares one id with recipe 2
+    assert a.normalized[1] == b.normalized[0] == cat.vocab.lookup("egg")
+    assert a.normalized is not a.ingredients
+    assert b.normalized is b.ingredients
+    assert cat.to_dict(a) == {"id": 1, "name": "Pancakes", "ingredients": ["flour", "eggs", "milk"], "steps": ["mix"]}
+
+
+def test_search_count_and_pagination():
+    cat = Catalog()
+    cat.load_rows([_row(i, f"Dish {i}" if i % 2 else f"Soup {i}", ["salt"]) for i in range(1, 11)])
+    assert cat.search()[0] == 10
+    total, page = cat.search("SOUP", skip=2, limit=2)
+    assert total == 5
+    assert [r.id for r in page] == [6, 8]
+    assert [r.id for r in cat.page(skip=8, limit=5)] == [9, 10]
+
+
+def test_apply_rows_keeps_id_order():
+    cat = Catalog()
+    cat.load_rows([_row(1, "A", ["salt"]), _row(5, "B", ["salt"]), _row(7, "D", ["salt"])])
+    before = cat.page()
+    cat.apply_rows({3, 5, 7}, [_row(3, "C", ["pepper"]), _row(5, "B2", ["salt"])])
+    assert [(r.id, r.name) for r in cat.page()] == [(1, "A"), (3, "C"), (5, "B2")]
+    assert cat.get(7) is None
+    # readers holding the old list are not affected (copy-on-write)
+    assert [r.name for r in before] == ["A", "B", "D"]
+
+
+def test_match_uses_normalized_ids():
+    cat = Catalog()
+    cat.load_rows([_row(1, "Salad", ["tomatoes", "salt"]), _row(2, "Rice", ["rice"])])
+    results = cat.match(cat.page(), {"tomato", "salt"})
+    assert results[0]["match"] is True and results[0]["matched"] == ["tomato", "salt"]
+    assert results[1]["missing"] == ["rice"]
+
+
+def test_memory_per_recipe_budget():
+    cat = Catalog()
+    cat.load_rows([
+        _row(i, f"Recipe {i}", ["flour", "milk", "egg", "baking powder", "salt", "butter"],
+             ["Mix dry ingredients", "Add wet ingredients", "Cook on skillet until golden"])
+        for i in range(1, 1001)
+    ])
+    usage = cat.memory_usage()
+    assert usage["recipes"] == 1000
+    # 1M recipes must fit comfortably in one worker
+    assert usage["bytes_per_recipe"] < 512
@@ -0,0 +1,172 @@
+# flake8: noqa
+import sys
+import json
+import threading
+from pathlib import Path
+
+# Ensure project root is on sys.path so `src` can be imported when tests are run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+from src import app as app_module
+from src import catalog, changes, crud, jobs, models, schemas, similar
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    # a file database: jobs use it from worker threads
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False}
+    )
+    models.Base.metadata.create_all(bind=engine)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    monkeypatch.setattr(jobs, "DATA_DIR", data_dir)
+    # installed structures are process-wide; put back whatever was there
+    monkeypatch.setattr(catalog, "store", catalog.Catalog())
+    monkeypatch.setattr(similar, "index", None)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def runner(session_factory):
+    runner = jobs.JobRunner(session_factory, max_workers=1)
+    yield runner
+    runner.shutdown()
+
+
+def _recipe(i, ingredients=("egg", "flour", "milk")):
+    return {"name": f"Bulk {i}", "ingredients": list(ingredients), "steps": ["mix"]}
+
+
+def _write_jsonl(name, records):
+    path = jobs.DATA_DIR / name
+    path.write_text("\n".join(r if isinstance(r, str) else json.dumps(r) for r in records) + "\n")
+    return name
+
+
+def _count(session_factory):
+    db = session_factory()
+    try:
+        return db.query(models.Recipe).count()
+    finally:
+        db.close()
+
+
+def test_bulk_create_chunks_names_and_skips_taken(session_factory):
+    db = session_factory()
+    try:
+        crud.create_recipe(db, schemas.RecipeCreate(**_recipe(3)))
+        # more names than fit in one IN list, plus repeats of a taken name
+        batch = [schemas.RecipeCreate(**_recipe(i)) for i in range(1200)]
+        batch.append(schemas.RecipeCreate(**_recipe(5)))
+        assert crud.create_recipes_bulk(db, batch) == 1199
+        assert db.query(models.Recipe).count() == 1200
+        assert changes.last_change_id(db) == 1200
+    finally:
+        db.close()
+
+
+def test_import_job_cancel_and_resume(runner, session_factory, monkeypatch):
+    name = _write_jsonl("recipes.jsonl", [_recipe(i) for i in range(25)] + ["{not json"])
+    real_bulk = crud.create_recipes_bulk
+
+    def cancel_after_first_chunk(db, batch):
+        added = real_bulk(db, batch)
+        runner.jobs()[0].cancel()
+        return added
+
+    monkeypatch.setattr(crud, "create_recipes_bulk", cancel_after_first_chunk)
+    job = runner.submit("import", path=name, chunk_size=10)
+    assert job.wait(10)
+    assert job.state == jobs.CANCELLED
+    assert job.processed == 10 and job.total == 26
+    assert _count(session_factory) == 10
+
+    monkeypatch.setattr(crud, "create_recipes_bulk", real_bulk)
+    runner.resume(job.id)
+    assert job.wait(10)
+    assert job.state == jobs.DONE, job.error
+    assert job.result == {"added": 25, "skipped": 1}
+    assert _count(session_factory) == 25
+    status = job.to_dict()
+    assert status["progress"] == 1.0 and status["processed"] == 26
+
+
+def test_reindex_swaps_in_fresh_structures(runner, session_factory, monkeypatch):
+    db = session_factory()
+    try:
+        crud.create_recipes_bulk(db, [schemas.RecipeCreate(**_recipe(i)) for i in range(20)])
+    finally:
+        db.close()
+    old_store = catalog.store
+    real_add = similar.SimilarityIndex.add_many
+
+    def cancel_after_first_chunk(self, items):
+        real_add(self, items)
+        runner.jobs()[0].cancel()
+
+    monkeypatch.setattr(similar.SimilarityIndex, "add_many", cancel_after_first_chunk)
+    job = runner.submit("reindex", chunk_size=8)
+    assert job.wait(10)
+    assert job.state == jobs.CANCELLED
+    # nothing is swapped in until the build is complete
+    assert catalog.store is old_store and similar.index is None
+
+    monkeypatch.setattr(similar.SimilarityIndex, "add_many", real_add)
+    runner.resume(job.id)
+    assert job.wait(10)
+    assert job.state == jobs.DONE, job.error
+    assert catalog.store is not old_store and catalog.store.loaded
+    assert catalog.store.count() == 20
+    assert len(similar.index) == 20
+    assert similar.index.neighbours(1)
+
+    # writes after the swap reach the new structures through the change log
+    db = session_factory()
+    try:
+        r = crud.create_recipe(db, schemas.RecipeCreate(**_recipe("late")))
+    finally:
+        db.close()
+    assert catalog.store.get(r.id) is not None
+    assert r.id in similar.index
+
+
+def test_reindex_is_not_started_twice(runner, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setitem(jobs.KINDS, "reindex", lambda job, session_factory: release.wait(10))
+    first = runner.submit("reindex")
+    assert runner.submit("reindex") is first
+    release.set()
+    assert first.wait(10)
+    assert runner.submit("reindex") is not first
+
+
+def test_jobs_api(runner, session_factory):
+    app_module.app.dependency_overrides[app_module.get_job_runner] = lambda: runner
+    try:
+        client = TestClient(app_module.app)
+        name = _write_jsonl("more.jsonl", [_recipe(i) for i in range(5)])
+        assert client.post("/api/jobs/import", json={"path": "../jobs.db"}).status_code == 400
+        assert client.post("/api/jobs/import", json={"path": "missing.jsonl"}).status_code == 404
+
+        res = client.post("/api/jobs/import", json={"path": name, "chunk_size": 2})
+        assert res.status_code == 202
+        job_id = res.json()["id"]
+        assert runner.get(job_id).wait(10)
+        status = client.get(f"/api/jobs/{job_id}").json()
+        assert status["state"] == "done"
+        assert status["processed"] == status["total"] == 5
+        assert status["result"]["added"] == 5
+        assert "rows_per_sec" in status
+        assert [j["id"] for j in client.get("/api/jobs").json()["items"]] == [job_id]
+
+        assert client.post(f"/api/jobs/{job_id}/resume").status_code == 409
+        assert client.get("/api/jobs/nope").status_code == 404
+    finally:
+        del app_module.app.dependency_overrides[app_module.get_job_runner]
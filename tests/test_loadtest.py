@@ -0,0 +1,30 @@
+# flake8: noqa
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# scripts/ is not a package; load the harness module from its file
+_spec = importlib.util.spec_from_file_location("loadtest", ROOT / "scripts" / "loadtest.py")
+loadtest = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(loadtest)
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 95) == 95
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile(values, 100) == 100
+    assert loadtest.percentile(list(range(1, 11)), 50) == 5
+    assert loadtest.percentile([7], 99) == 7
+    assert loadtest.percentile([], 50) is None
+
+
+def test_parse_mix():
+    assert loadtest.parse_mix("root=1, search=2.5,write") == {"root": 1.0, "search": 2.5, "write": 1.0}
+    with pytest.raises(ValueError):
+        loadtest.parse_mix("nope=1")
+    with pytest.raises(ValueError):
+        loadtest.parse_mix("root=0")
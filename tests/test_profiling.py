@@ -0,0 +1,75 @@
+# flake8: noqa
+import sys
+import threading
+from pathlib import Path
+
+# Ensure project root is on sys.path so `src` can be imported when tests are run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src import app as app_module
+from src import profiling
+
+client = TestClient(app_module.app)
+
+
+def test_profile_requires_secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", None)
+    res = client.post("/api/match", json={"ingredients": ["egg"]}, headers={"X-Profile": "anything"})
+    assert res.status_code == 200
+    assert "x-profile-id" not in res.headers
+
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", "s3cret")
+    res = client.post("/api/match", json={"ingredients": ["egg"]}, headers={"X-Profile": "wrong"})
+    assert "x-profile-id" not in res.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reports_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "MAX_REPORTS", 3)
+    for i in range(5):
+        profiling.save_report({"id": f"r{i}"})
+    assert len(list(tmp_path.glob("request-*.json"))) == 3
+
+
+def test_profiled_match_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", "s3cret")
+    client.post("/api/recipes", json={"name": "ProfiledDish", "ingredients": ["egg", "flour"], "steps": ["mix"]})
+
+    res = client.post("/match", data={"ingredients": "egg\nflour"}, headers={"X-Profile": "s3cret"})
+    assert res.status_code == 200
+    pid = res.headers["x-profile-id"]
+
+    # stored reports are only readable with the secret
+    assert client.get(f"/api/profiles/{pid}").status_code == 404
+    report = client.get(f"/api/profiles/{pid}", headers={"X-Profile": "s3cret"}).json()
+    assert report["path"] == "/match"
+    assert report["status"] == 200
+    assert any("FROM recipes" in q["statement"] for q in report["sql"])
+    assert report["hotspots"]["normalize_ingredient"]["calls"] > 0
+    assert report["hotspots"]["json.loads"]["calls"] > 0
+    assert report["hotspots"]["template_render"]["calls"] == 1
+
+
+def test_stack_sampler_writes_folded_stacks(tmp_path):
+    done = threading.Event()
+    worker = threading.Thread(target=done.wait)
+    worker.start()
+    try:
+        sampler = profiling.StackSampler(1, tmp_path / "stacks.folded")
+        sampler.sample()
+        sampler.sample()
+        sampler.dump()
+    finally:
+        done.set()
+        worker.join()
+    lines = (tmp_path / "stacks.folded").read_text().splitlines()
+    waiting = [line for line in lines if "wait (threading.py" in line]
+    assert waiting
+    stack, count = waiting[0].rsplit(" ", 1)
+    assert stack.startswith("_bootstrap (threading.py")
+    assert int(count) == 2
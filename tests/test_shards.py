@@ -0,0 +1,166 @@
+# flake8: noqa
+import sys
+import threading
+from pathlib import Path
+
+# Ensure project root is on sys.path so `src` can be imported when tests are run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
+
+import pytest
+from sqlalchemy import create_engine
+from fastapi.testclient import TestClient
+
+from src import app as app_module
+from src import catalog, changes, crud, jobs, models, schemas, similar
+from src.db import ShardedSessionFactory, fan_out, shard_url
+
+SHARDS = 3
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'recipes.db'}"
+    engines = [
+        create_engine(shard_url(url, i), connect_args={"check_same_thread": False})
+        for i in range(SHARDS)
+    ]
+    for e in engines:
+        models.Base.metadata.create_all(bind=e)
+    # keep process-wide read structures out of the way
+    monkeypatch.setattr(catalog, "store", catalog.Catalog())
+    monkeypatch.setattr(similar, "index", None)
+    factory = ShardedSessionFactory(engines)
+    db = factory()
+    yield factory, db
+    db.close()
+    for e in engines:
+        e.dispose()
+
+
+def _recipe(name, ingredients=("egg", "flour")):
+    return schemas.RecipeCreate(name=name, ingredients=list(ingredients), steps=["mix"])
+
+
+def test_shard_url():
+    assert shard_url("sqlite:///./recipies.db", 2) == "sqlite:///./recipies-shard2.db"
+    with pytest.raises(ValueError):
+        shard_url("sqlite://", 0)
+
+
+def test_writes_route_by_name_and_ids_carry_the_shard(sharded):
+    _, db = sharded
+    created = [crud.create_recipe(db, _recipe(f"Dish {i}")) for i in range(30)]
+    ids = [r.id for r in created]
+    assert len(set(ids)) == 30
+    for r in created:
+        shard = db.shard_for_name(r.name)
+        assert r.id % SHARDS == shard
+        assert db.shard(shard).get(models.Recipe, r.id) is not None
+        assert crud.get_recipe(db, r.id).name == r.name
+    # every shard got some, and queries really run on worker threads
+    assert all(fan_out(db, lambda s: s.query(models.Recipe).count()))
+    names = fan_out(db, lambda s: threading.current_thread().name)
+    assert all(n.startswith("recipies-shard") for n in names)
+
+
+def test_pagination_and_counts_are_global(sharded):
+    _, db = sharded
+    crud.create_recipes_bulk(db, [_recipe(f"Soup {i}" if i % 3 else f"Stew {i}") for i in range(40)])
+    assert crud.count_recipes(db) == 40
+    everything = sorted(r.id for r in crud.get_recipes(db, skip=0, limit=100))
+    pages = []
+    for page in range(5):
+        pages.extend(r.id for r in crud.get_recipes(db, skip=page * 9, limit=9))
+    assert pages == everything
+
+    assert crud.count_recipes_filtered(db, "stew") == 14
+    stews = []
+    for page in range(3):
+        stews.extend(crud.search_recipes(db, "STEW", skip=page * 5, limit=5))
+    assert len(stews) == 14
+    assert [r.id for r in stews] == sorted(r.id for r in stews)
+    assert all(r.name.startswith("Stew") for r in stews)
+
+
+def test_name_uniqueness_spans_shards(sharded):
+    _, db = sharded
+    a = crud.create_recipe(db, _recipe("Alpha"))
+    # find a name that hashes to another shard, then rename onto it
+    other = next(f"Beta {i}" for i in range(100) if db.shard_for_name(f"Beta {i}") != a.id % SHARDS)
+    crud.update_recipe(db, a.id, _recipe(other))
+    found = crud.get_recipe_by_name(db, other)
+    assert found is not None and found.id == a.id
+    # its row stayed on the original shard; bulk still sees the name
+    assert crud.create_recipes_bulk(db, [_recipe(other), _recipe("Gamma")]) == 1
+    assert crud.count_recipes(db) == 2
+
+
+def test_match_fans_out_and_merges_by_id(sharded):
+    _, db = sharded
+    crud.create_recipes_bulk(db, [_recipe(f"M {i}", ["egg", "milk"] if i % 2 else ["rice"]) for i in range(12)])
+    results = crud.match_recipes(db, {"egg", "milk"}, limit=5)
+    assert [r["id"] for r in results] == sorted(r.id for r in crud.get_recipes(db, limit=100))[:5]
+    for r in results:
+        assert r["match"] == (r["missing_count"] == 0)
+
+
+def test_catalog_follows_writes_on_every_shard(sharded):
+    factory, db = sharded
+    crud.create_recipes_bulk(db, [_recipe(f"C {i}") for i in range(9)])
+    store = catalog.Catalog()
+    store.load(db)
+    assert store.count() == 9
+    mark = changes.last_change_id(db)
+    assert isinstance(mark, tuple) and len(mark) == SHARDS
+
+    # a write through another session (think: another worker process)
+    other = factory()
+    try:
+        late = crud.create_recipe(other, _recipe("C late"))
+        crud.delete_recipe(other, store.page(limit=1)[0].id)
+    finally:
+        other.close()
+    assert store.sync(db)
+    assert store.count() == 9
+    assert store.get(late.id).name == "C late"
+    assert changes.caught_up(db, store.last_change)
+
+
+def test_reindex_job_reads_every_shard(sharded):
+    factory, db = sharded
+    crud.create_recipes_bulk(db, [_recipe(f"R {i}", ["egg", "flour", f"x{i % 2}"]) for i in range(15)])
+    job = jobs.Job("reindex", {"chunk_size": 4})
+    jobs.run(job, factory)
+    assert job.state == jobs.DONE, job.error
+    assert catalog.store.count() == 15
+    assert [r.id for r in catalog.store.page(limit=100)] == sorted(r.id for r in crud.get_recipes(db, limit=100))
+    assert len(similar.index) == 15
+    assert isinstance(catalog.store.last_change, tuple)
+
+
+def test_api_over_shards(sharded, monkeypatch):
+    factory, _ = sharded
+
+    def sharded_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app_module.app.dependency_overrides, app_module.get_db, sharded_db)
+    client = TestClient(app_module.app)
+    ids = []
+    for i in range(7):
+        res = client.post("/api/recipes", json={"name": f"Api {i}", "ingredients": ["egg"], "steps": []})
+        assert res.status_code == 200
+        ids.append(res.json()["id"])
+    assert client.post("/api/recipes", json={"name": "Api 3", "ingredients": [], "steps": []}).status_code == 400
+    assert client.get(f"/api/recipes/{ids[4]}").json()["name"] == "Api 4"
+
+    first = client.get("/api/recipes", params={"q": "api", "page": 1, "page_size": 4})
+    second = client.get("/api/recipes", params={"q": "api", "page": 2, "page_size": 4})
+    assert first.json()["total"] == 7
+    assert 'rel="next"' in first.headers["link"]
+    got = [r["id"] for r in first.json()["items"] + second.json()["items"]]
+    assert got == sorted(ids)
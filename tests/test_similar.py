@@ -0,0 +1,122 @@
+# flake8: noqa
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `src` can be imported when tests are run
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
+
+import random
+import tracemalloc
+
+from src.similar import BUCKET_CAP, SimilarityIndex, jaccard, minhash, token_hash
+
+
+def test_minhash_is_deterministic_and_order_free():
+    a = minhash(token_hash(t) for t in ["egg", "flour", "milk"])
+    b = minhash(token_hash(t) for t in ["milk", "egg", "flour"])
+    assert a == b
+    assert minhash([]) == ()
+
+
+def test_index_signature_matches_minhash():
+    idx = SimilarityIndex()
+    idx.upsert(1, ["egg", "flour", "milk"])
+    idx.upsert(2, ["salt"])
+    assert idx._signature(idx._sets[1]) == minhash(token_hash(t) for t in ["egg", "flour", "milk"])
+    assert idx._signature(idx._sets[2]) == minhash([token_hash("salt")])
+
+
+def test_neighbours_ranked_by_similarity():
+    idx = SimilarityIndex(top_n=2)
+    idx.rebuild([
+        (1, ["egg", "flour", "milk", "sugar"]),
+        (2, ["eggs", "flour", "milk", "sugar"]),
+        (3, ["egg", "flour", "milk", "butter"]),
+        (4, ["rice", "soy sauce"]),
+    ])
+    ids = [rid for rid, _ in idx.neighbours(1)]
+    assert ids[0] == 2
+    assert 4 not in ids
+    assert idx.neighbours(4) == []
+
+
+def test_incremental_update_and_remove():
+    idx = SimilarityIndex()
+    idx.upsert(1, ["egg", "flour", "milk"])
+    idx.upsert(2, ["rice", "soy sauce", "ginger"])
+    assert idx.neighbours(1) == []
+
+    # recipe 2 now resembles recipe 1: both lists refresh
+    idx.upsert(2, ["egg", "flour", "milk"])
+    assert idx.neighbours(1) == [(2, 1.0)]
+    assert idx.neighbours(2) == [(1, 1.0)]
+
+    # moving it away again drops the stale neighbour
+    idx.upsert(2, ["rice", "soy sauce", "ginger"])
+    assert idx.neighbours(1) == []
+
+    idx.upsert(2, ["egg", "flour", "milk"])
+    idx.remove(2)
+    assert idx.neighbours(1) == []
+    assert 2 not in idx
+
+
+def test_incremental_matches_rebuild():
+    data = [
+        (i, ["egg", "flour", "milk", "salt", f"extra{i % 3}"]) for i in range(1, 20)
+    ] + [(i, ["rice", "soy sauce", f"veg{i % 2}"]) for i in range(20, 30)]
+    inc = SimilarityIndex()
+    for rid, ings in data:
+        inc.upsert(rid, ings)
+    full = SimilarityIndex()
+    full.rebuild(data)
+    for rid, _ in data:
+        assert inc.neighbours(rid) == full.neighbours(rid)
+
+
+def test_batch_update_matches_rebuild():
+    data = [(i, ["egg", "flour", "milk", f"extra{i % 4}"]) for i in range(1, 16)]
+    idx = SimilarityIndex()
+    idx.rebuild(data[:10])
+    # one batch that edits, removes and adds recipes
+    edited = {3: ["rice", "soy sauce"], 4: ["egg", "flour", "sugar"]}
+    added = dict(data[10:])
+    idx.update_many({**edited, **added}, [5, 6])
+    expected = [(i, edited.get(i, ings)) for i, ings in data if i not in (5, 6)]
+    full = SimilarityIndex()
+    full.rebuild(expected)
+    for rid, _ in expected:
+        assert idx.neighbours(rid) == full.neighbours(rid)
+    assert 5 not in idx
+
+
+def test_full_buckets_bound_candidates():
+    idx = SimilarityIndex()
+    idx.rebuild([(i, ["egg", "flour", "milk"]) for i in range(1, 101)])
+    assert max(len(idx._candidates(i)) for i in range(1, 101)) < BUCKET_CAP
+    assert idx.neighbours(1)
+    for i in range(1, 101):
+        idx.remove(i)
+    # nothing left pointing at removed recipes
+    assert len(idx) == 0 and not idx._buckets and not idx._neighbours
+
+
+def test_jaccard():
+    assert jaccard({"a", "b"}, {"b", "c"}) == 1 / 3
+    assert jaccard(set(), {"a"}) == 0.0
+
+
+def test_memory_per_recipe_stays_small():
+    rng = random.Random(0)
+    vocab = [f"ingredient {i}" for i in range(300)]
+    data = [(i, rng.sample(vocab, rng.randint(3, 10))) for i in range(1, 3001)]
+    tracemalloc.start()
+    try:
+        idx = SimilarityIndex()
+        idx.rebuild(data)
+        used, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(idx) == len(data)
+    # token sets, bucket entries and neighbour ids, not strings and tuples
+    assert used / len(data) < 2500
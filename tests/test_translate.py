@@ -24,3 +24,34 @@ def test_view_translation_polish():
     # check Polish translations for heading and a known ingredient
     assert "Składniki" in text
     assert "pomidor" in text
+
+
+def test_translate_phrases_inside_steps():
+    from src.translate import translate_phrases
+
+    assert translate_phrases("Add chopped tomatoes and stock", "pl") == "Dodaj posiekane pomidory i bulion"
+    # longest match wins over the single-word entry
+    assert translate_phrases("Mix baking powder and milk", "es") == "Mezcla levadura en polvo y leche"
+    # only whole words are translated
+    assert translate_phrases("eggplant", "pl") == "eggplant"
+    assert translate_phrases("Stir well", "pl") == "Stir well"
+    assert translate_phrases("Tomato", "es") == "Tomate"
+    assert translate_phrases("tomato", "xx") == "tomato"
+
+
+def test_view_translates_steps_by_phrase():
+    res = client.post("/api/recipes", json={"name": "PlSteps", "ingredients": ["tomatoes"], "steps": ["Add chopped tomatoes and stock"]})
+    rid = res.json()["id"]
+    data = client.get(f"/recipes/{rid}?lang=pl").json()
+    assert data["steps"] == ["Dodaj posiekane pomidory i bulion"]
+    assert data["ingredients"] == ["pomidory"]
+
+
+def test_ui_labels_are_not_phrases():
+    from src.translate import translate_phrases, translate_text
+
+    assert translate_phrases("Put the lid back on", "pl") == "Put the lid back on"
+    assert translate_phrases("Mix the ingredients", "pl") == "Wymieszaj the ingredients"
+    assert translate_phrases("Repeat the steps", "es") == "Repeat the steps"
+    # whole-string lookups still translate the labels
+    assert translate_text("Back", "pl") == "Wstecz"